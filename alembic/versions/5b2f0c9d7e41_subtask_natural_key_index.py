@@ -0,0 +1,34 @@
+"""subtask natural key index
+
+Revision ID: 5b2f0c9d7e41
+Revises: eaaa6bacc06c
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5b2f0c9d7e41"
+down_revision: Union[str, None] = "eaaa6bacc06c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_hmm_typical_sub_task_natural_key",
+        "hmm_typical_sub_task",
+        ["name", "task_type", "task_lvl"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_hmm_typical_sub_task_natural_key",
+        table_name="hmm_typical_sub_task",
+    )
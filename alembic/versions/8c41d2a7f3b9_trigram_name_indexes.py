@@ -0,0 +1,45 @@
+"""trigram name indexes
+
+Revision ID: 8c41d2a7f3b9
+Revises: 5b2f0c9d7e41
+Create Date: 2026-10-19 12:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8c41d2a7f3b9"
+down_revision: Union[str, None] = "5b2f0c9d7e41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRGM_COLUMNS = (
+    ("hmm_hero", "name"),
+    ("hmm_typical_sub_task", "name"),
+    ("hmm_task_group", "name"),
+    ("hmm_expedition_template", "name"),
+    ("hmm_expedition_template", "description"),
+    ("hmm_user", "username"),
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, column in TRGM_COLUMNS:
+        op.create_index(
+            f"ix_{table}_{column}_trgm",
+            table,
+            [column],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    for table, column in TRGM_COLUMNS:
+        op.drop_index(f"ix_{table}_{column}_trgm", table_name=table)
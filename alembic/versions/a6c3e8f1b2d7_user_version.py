@@ -0,0 +1,35 @@
+"""user version
+
+Revision ID: a6c3e8f1b2d7
+Revises: f3a9b6c1d284
+Create Date: 2026-10-19 15:10:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a6c3e8f1b2d7"
+down_revision: Union[str, None] = "f3a9b6c1d284"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "hmm_user",
+        sa.Column(
+            "version",
+            sa.Integer(),
+            server_default=sa.text("0"),
+            nullable=False,
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("hmm_user", "version")
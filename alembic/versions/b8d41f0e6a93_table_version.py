@@ -0,0 +1,131 @@
+"""table version
+
+Revision ID: b8d41f0e6a93
+Revises: a6c3e8f1b2d7
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b8d41f0e6a93"
+down_revision: Union[str, None] = "a6c3e8f1b2d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = (
+    "hmm_expedition_template",
+    "hmm_hero",
+    "hmm_hero_used_time_table",
+    "hmm_heroes2_expedition",
+    "hmm_task2_expedition",
+    "hmm_task2_group",
+    "hmm_task_group",
+    "hmm_typical_sub_task",
+    "hmm_user",
+)
+
+
+# Locking: a counter row is locked from its bump until the transaction ends,
+# so bumping it from the writing statement would serialize all writers of a
+# table and could deadlock transactions writing tables in different orders.
+# Instead the statement trigger only records the table name in a
+# transaction-local setting (no locks). A deferred constraint trigger then
+# bumps all recorded counters at commit in a single upsert ordered by table
+# name: writers only wait for each other for the duration of a commit, and
+# every transaction takes the counter locks in the same order.
+# TRUNCATE fires no row triggers and bumps the counter right away; it holds
+# an exclusive lock on the table anyway.
+
+
+def upgrade() -> None:
+    op.create_table(
+        "hmm_table_version",
+        sa.Column("table_name", sa.String(length=63), nullable=False),
+        sa.Column(
+            "version",
+            sa.BigInteger(),
+            server_default=sa.text("0"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("table_name"),
+    )
+    op.execute(
+        sa.text(
+            "INSERT INTO hmm_table_version (table_name)"
+            " SELECT unnest(CAST(:tables AS text[]))"
+        ).bindparams(tables=list(VERSIONED_TABLES))
+    )
+    op.execute(
+        """
+        CREATE FUNCTION hmm_note_table_write() RETURNS trigger AS $$
+        DECLARE
+            written text[] := string_to_array(
+                current_setting('hmm.written_tables', true), ','
+            );
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                UPDATE hmm_table_version SET version = version + 1
+                WHERE table_name = TG_TABLE_NAME;
+            ELSIF written IS NULL OR NOT TG_TABLE_NAME = ANY(written) THEN
+                PERFORM set_config(
+                    'hmm.written_tables',
+                    array_to_string(
+                        array_append(written, TG_TABLE_NAME::text), ','
+                    ),
+                    true
+                );
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION hmm_bump_table_version() RETURNS trigger AS $$
+        DECLARE
+            written text := current_setting('hmm.written_tables', true);
+        BEGIN
+            IF coalesce(written, '') = '' THEN
+                RETURN NULL;
+            END IF;
+            PERFORM set_config('hmm.written_tables', '', true);
+            INSERT INTO hmm_table_version AS tv (table_name, version)
+            SELECT ti, 1
+            FROM unnest(string_to_array(written, ',')) AS ti
+            ORDER BY ti
+            ON CONFLICT (table_name)
+            DO UPDATE SET version = tv.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    for table in VERSIONED_TABLES:
+        op.execute(
+            f"CREATE TRIGGER {table}_write"
+            " AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE"
+            f" ON {table} FOR EACH STATEMENT"
+            " EXECUTE FUNCTION hmm_note_table_write()"
+        )
+        op.execute(
+            f"CREATE CONSTRAINT TRIGGER {table}_version"
+            f" AFTER INSERT OR UPDATE OR DELETE ON {table}"
+            " DEFERRABLE INITIALLY DEFERRED FOR EACH ROW"
+            " EXECUTE FUNCTION hmm_bump_table_version()"
+        )
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_version ON {table}")
+        op.execute(f"DROP TRIGGER {table}_write ON {table}")
+    op.execute("DROP FUNCTION hmm_bump_table_version()")
+    op.execute("DROP FUNCTION hmm_note_table_write()")
+    op.drop_table("hmm_table_version")
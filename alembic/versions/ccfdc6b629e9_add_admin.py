@@ -24,7 +24,9 @@ depends_on: Union[str, Sequence[str], None] = None
 def upgrade() -> None:
     # ### commands auto generated by Alembic - please adjust! ###
 
-    user = UserCreate(username="admin", password="admin", is_super=True)
+    user = UserCreate(
+        username="admin", password="admin", is_super=True
+    ).with_sync_hash()
     stmt = sa.insert(User).values(
         user.model_dump(exclude_unset=True, exclude_none=True)
     )
@@ -0,0 +1,52 @@
+"""expedition search vector
+
+Revision ID: d17e5a0b9c62
+Revises: 8c41d2a7f3b9
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d17e5a0b9c62"
+down_revision: Union[str, None] = "8c41d2a7f3b9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "hmm_expedition_template",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('russian', coalesce(name, '')), 'A')"
+                " || setweight(to_tsvector('russian',"
+                " coalesce(description, '')), 'B')",
+                persisted=True,
+            ),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_hmm_expedition_template_search_vector",
+        "hmm_expedition_template",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_hmm_expedition_template_search_vector",
+        table_name="hmm_expedition_template",
+    )
+    op.drop_column("hmm_expedition_template", "search_vector")
@@ -0,0 +1,44 @@
+"""hero composite indexes
+
+Revision ID: f3a9b6c1d284
+Revises: d17e5a0b9c62
+Create Date: 2026-10-19 13:30:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a9b6c1d284"
+down_revision: Union[str, None] = "d17e5a0b9c62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_hmm_hero_class_mana",
+        "hmm_hero",
+        ["hero_class", "mana"],
+        unique=False,
+        postgresql_include=["hero_lvl", "id"],
+    )
+    op.create_index(
+        "ix_hmm_hero_class_lvl_mana",
+        "hmm_hero",
+        ["hero_class", "hero_lvl", "mana"],
+        unique=False,
+    )
+    # prefix of both composite indexes
+    op.drop_index("ix_hmm_hero_hero_class", table_name="hmm_hero")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_hmm_hero_hero_class", "hmm_hero", ["hero_class"], unique=False
+    )
+    op.drop_index("ix_hmm_hero_class_lvl_mana", table_name="hmm_hero")
+    op.drop_index("ix_hmm_hero_class_mana", table_name="hmm_hero")
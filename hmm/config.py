@@ -36,6 +36,9 @@ class App(BaseSettings):
     workers: int = 1
     name: str = "V"
     PAGINATOR_MAX_LIMIT: int = Field(200, ge=1)
+    BULK_CHUNK_SIZE: int = Field(5000, ge=1)
+    UPLOAD_CHUNK_SIZE: int = Field(1024 * 1024, ge=1024)
+    IMPORT_MAX_ERRORS: int = Field(1000, ge=0)
     container_label: str = "com.vps.select"
     nginx_on: bool = False
     FIFO_DIR: str = Field("out")
@@ -176,6 +179,24 @@ class AuthSettings(BaseSettings):
         "36EEdevj5af6WDVbrtBuubLtkH3CqPkm#2xCY7ZWS0dNQ6emsm8MXyzGKXa41bC6"
     )
     jwt_algorithm: str = "HS256"
+    stateless_tokens: bool = Field(
+        False,
+        description=(
+            "Issue tokens carrying the user claims and version: requests"
+            " are authenticated without a db lookup"
+        ),
+    )
+    revocation_refresh: float = Field(
+        30, gt=0, description="Revoked token versions reload period, s"
+    )
+    hash_workers: int = Field(
+        2, ge=1, description="Processes hashing and checking passwords"
+    )
+    hash_queue_limit: int = Field(
+        32,
+        ge=1,
+        description="Password operations waiting for a worker before 429",
+    )
 
     @computed_field
     @property
@@ -207,12 +228,80 @@ class AuthSettings(BaseSettings):
         env_prefix = "auth_"
 
 
+class CacheSettings(BaseSettings):
+    enabled: bool = True
+    # x-total-count / x-min-date-from / x-max-date-till headers
+    headers_ttl: float = Field(10, ge=0)
+    headers_stale_ttl: float = Field(60, ge=0)
+    headers_maxsize: int = Field(1024, ge=1)
+    # identical concurrent list requests share one db round trip
+    coalesce_requests: bool = True
+    # authenticated user records by username
+    users_ttl: float = Field(30, ge=0)
+    users_maxsize: int = Field(4096, ge=1)
+    # decoded bearer tokens / auth cookies, never kept past their expiry
+    credentials_ttl: float = Field(300, ge=0)
+    credentials_maxsize: int = Field(16384, ge=1)
+    # external IdP token introspection, by token hash; active results are
+    # kept until the token `exp` at most
+    introspection_ttl: float = Field(300, ge=0)
+    introspection_negative_ttl: float = Field(5, ge=0)
+    introspection_maxsize: int = Field(16384, ge=1)
+    # serialized sub-task catalog pages, dropped on catalog writes
+    catalog_ttl: float = Field(3600, ge=0)
+    catalog_maxsize: int = Field(256, ge=1)
+    # cross-worker invalidation over postgres LISTEN/NOTIFY
+    bus_enabled: bool = True
+    bus_channel: str = "hmm_invalidate"
+    bus_reconnect_delay: float = Field(1, gt=0)
+
+    class Config:
+        env_prefix = "cache_"
+
+
+class HttpSettings(BaseSettings):
+    """Shared outgoing http client"""
+
+    timeout: float = Field(10, gt=0)
+    connect_timeout: float = Field(5, gt=0)
+    max_connections: int = Field(100, ge=1)
+    max_keepalive_connections: int = Field(20, ge=0)
+
+    class Config:
+        env_prefix = "http_"
+
+
+class SudirSettings(BaseSettings):
+    client_id: str = ""
+    client_secret: str = ""
+    redirect_url: str = ""
+    logout_redirect_url: str = ""
+    discovery_url: str = ""
+    # the discovery document is refreshed in the background after the ttl
+    discovery_ttl: float = Field(3600, ge=0)
+    discovery_stale_ttl: float = Field(24 * 3600, ge=0)
+
+
+class SudirInnerSettings(SudirSettings):
+    class Config:
+        env_prefix = "sudir_inner_"
+
+
+class SudirOuterSettings(SudirSettings):
+    class Config:
+        env_prefix = "sudir_outer_"
+
+
 class Settings(BaseSettings):
     app: App = Field(default_factory=App)
     logging: Logging = Field(default_factory=Logging)
     db: DbSettings = Field(default_factory=DbSettings)
     api: Api = Field(default_factory=Api)
     auth: AuthSettings = Field(default_factory=AuthSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    http: HttpSettings = Field(default_factory=HttpSettings)
+    sudir_inner: SudirInnerSettings = Field(default_factory=SudirInnerSettings)
+    sudir_outer: SudirOuterSettings = Field(default_factory=SudirOuterSettings)
     MEDIA_DIR: Path = Path("./media")
     INTERNAL_MEDIA_DIR: Path = Path("./internal_media")
 
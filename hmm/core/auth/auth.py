@@ -1,5 +1,6 @@
 import base64
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from functools import cache
 from fastapi import Depends, Request, Response
 from fastapi.security import OAuth2PasswordBearer
@@ -15,19 +16,22 @@ from jose import jwt
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from hmm.config import get_settings
-from hmm.core.db import AsyncSessionMaker
+from hmm.core.cache import TTLCache, register_cache
+from hmm.core.auth.revocation import get_revocation_list
+from hmm.core.db import get_session
 from hmm.crud.auth import get_user_crud
 from hmm.models.auth import User
 from hmm.schemas.auth import (
     SecPasswordStr,
     UpdateUser,
+    UserClaims,
     UserCreate,
     UserNameStr,
     UserPatchMe,
     UserSession,
 )
 from hmm.schemas.base import OrmModel
-from hmm.core.crypto import get_fernet, verify_password
+from hmm.core.crypto import check_password, get_fernet
 from hmm.core.exceptions import (
     BadCredsError,
     BaseArgsRestException,
@@ -69,6 +73,25 @@ class UserRegister(OrmModel):
 class CookieData(BaseModel):
     username: str
     date: int = Field(default_factory=lambda: int(datetime.now().timestamp()))
+    claims: UserClaims | None = None
+
+
+@cache
+def get_credentials_cache() -> TTLCache:
+    """Raw bearer token / cookie -> verified `CookieData`"""
+    settings = get_settings().cache
+    return TTLCache(
+        settings.credentials_maxsize,
+        settings.credentials_ttl,
+        name="credentials",
+    )
+
+
+def _cache_credentials(key: tuple, data: CookieData, expires_at: float):
+    settings = get_settings().cache
+    ttl = min(expires_at - time.time(), settings.credentials_ttl)
+    if settings.enabled and ttl > 0:
+        get_credentials_cache().set(key, data, ttl=ttl)
 
 
 class BaseAuthSchema:
@@ -92,7 +115,7 @@ class CookieSchema(BaseAuthSchema):
 
     def get_cookie(self, ses: UserSession) -> str:
         c = CookieData(username=ses.username)
-        d0 = c.model_dump_json().encode()
+        d0 = c.model_dump_json(exclude_none=True).encode()
         d1 = get_fernet().encrypt(d0)
         d2 = base64.urlsafe_b64encode(d1).decode()
         return d2
@@ -120,10 +143,15 @@ class CookieSchema(BaseAuthSchema):
         return CookieData.model_validate_json(d2)
 
     def authenticate(self, r: Request) -> CookieData:
+        key = (self.KEY, r.cookies.get(self.KEY))
+        if (c := get_credentials_cache().get(key)) is not None:
+            return c
         try:
-            return self._authenticate(r)
+            c = self._authenticate(r)
         except Exception as e:
             raise BadCredsError(details=dict(error=str(e)))
+        _cache_credentials(key, c, c.date + get_settings().auth.max_age)
+        return c
 
 
 oauth2_scheme = OAuth2PasswordBearer(
@@ -154,6 +182,35 @@ class TokenPayload(OrmModel):
     aud: list[str] = Field(default_factory=lambda: AUDIENCE)
     sub: int = Field(description="user_id")
     una: str = Field(description="username")
+    # stateless token claims
+    sup: bool | None = Field(None, description="is_super")
+    act: bool | None = Field(None, description="is_active")
+    cat: int | None = Field(None, description="created_at")
+    ver: int | None = Field(None, description="user version")
+
+    @classmethod
+    def stateless(cls, ses: UserSession) -> "TokenPayload":
+        return cls(
+            sub=ses.id,
+            una=ses.username,
+            sup=ses.is_super,
+            act=ses.is_active,
+            cat=int(ses.created_at.timestamp()),
+            ver=ses.version,
+        )
+
+    @property
+    def claims(self) -> UserClaims | None:
+        if self.ver is None:
+            return None
+        return UserClaims(
+            id=self.sub,
+            username=self.una,
+            is_super=self.sup,
+            is_active=self.act,
+            created_at=datetime.fromtimestamp(self.cat, timezone.utc),
+            version=self.ver,
+        )
 
     @computed_field
     @property
@@ -187,7 +244,7 @@ class TokenPayload(OrmModel):
 
     def jwt_encode(self) -> str:
         return jwt.encode(
-            self.model_dump(mode="json"),
+            self.model_dump(mode="json", exclude_none=True),
             get_settings().auth.jwt_secret,
             algorithm=get_settings().auth.jwt_algorithm,
         )
@@ -196,7 +253,10 @@ class TokenPayload(OrmModel):
 class TokenSchema(BaseAuthSchema):
 
     def login(self, r: Response, ses: UserSession) -> LoginResponse:
-        token = TokenPayload(sub=ses.id, una=ses.username).jwt_encode()
+        if get_settings().auth.stateless_tokens:
+            token = TokenPayload.stateless(ses).jwt_encode()
+        else:
+            token = TokenPayload(sub=ses.id, una=ses.username).jwt_encode()
         return LoginResponse(access_token=token)
 
     def logout(self, r: Response):
@@ -207,8 +267,22 @@ class TokenSchema(BaseAuthSchema):
         scheme, param = get_authorization_scheme_param(authorization)
         if not authorization or scheme.lower() != "bearer":
             raise TokenSchemaError()
+        key = ("bearer", param)
+        if (c := get_credentials_cache().get(key)) is not None:
+            return c
         token = TokenPayload.jwt_decode(param)
-        return CookieData(username=token.una, date=token.iat)
+        c = CookieData(username=token.una, date=token.iat, claims=token.claims)
+        _cache_credentials(key, c, token.exp)
+        return c
+
+
+@cache
+def get_user_cache() -> TTLCache:
+    """Authenticated users by username. Entries are dropped on any
+    committed write to the users table."""
+    settings = get_settings().cache
+    ttl = settings.users_ttl if settings.enabled else 0
+    return register_cache(TTLCache(settings.users_maxsize, ttl, name="user"))
 
 
 class UserSessionManager:
@@ -224,7 +298,7 @@ class UserSessionManager:
         user = await get_user_crud().get_one(
             session, [User.username == creds.username]
         )
-        if not verify_password(creds.password, user.hashed_password):
+        if not await check_password(creds.password, user.hashed_password):
             raise PasswordError(details=dict(info="password1 != password2"))
         return UserSession.model_validate(user)
 
@@ -248,20 +322,30 @@ class UserSessionManager:
         pass
 
     async def authenticate(
-        self, request: Request, response: Response
+        self, session: AsyncSession, request: Request, response: Response
     ) -> UserSession:
         c = self.schema.authenticate(request)
-        async with AsyncSessionMaker() as session:
-            user = await get_user_crud().get_one(
-                session, [User.username == c.username]
-            )
-            t = user.updated_at.timestamp()
-            if not user.is_active or t > c.date:
-                await self.logout(session, user)
-                self.schema.logout(response)
-                raise BadCredsError(details=dict(error="Incorrect creds"))
+        if c.claims is not None and get_revocation_list().accepts(c.claims):
+            return c.claims
+        user = await get_user_cache().get_or_load(
+            c.username,
+            lambda: self._load_user(session, c.username),
+            tags=(User.__tablename__,),
+        )
+        t = user.updated_at.timestamp()
+        if not user.is_active or t > c.date:
+            await self.logout(session, user)
+            self.schema.logout(response)
+            raise BadCredsError(details=dict(error="Incorrect creds"))
         return user
 
+    @staticmethod
+    async def _load_user(session: AsyncSession, username: str) -> UserSession:
+        user = await get_user_crud().get_one(
+            session, [User.username == username]
+        )
+        return UserSession.model_validate(user)
+
     async def patch(
         self,
         session: AsyncSession,
@@ -271,13 +355,15 @@ class UserSessionManager:
     ) -> User:
         where = [User.id == user.id]
         crud = get_user_crud()
-        ndata = data.model_patch(user)
+        cuser = await crud.get_one_raw(session, where)
+        ndata = await data.model_patch(cuser)
         if ndata:
+            ndata["version"] = User.version + 1
             await crud.update(session, where, ndata)
-        res = await crud.get_one_raw(session, where)
+            await session.refresh(cuser)
         if force:
             await session.commit()
-        return res
+        return cuser
 
     async def update(
         self, session: AsyncSession, data: UpdateUser, force: bool = True
@@ -286,8 +372,9 @@ class UserSessionManager:
         crud = get_user_crud()
         cuser = await crud.get_one_raw(session, where)
 
-        ndata = data.model_patch(cuser)
+        ndata = await data.model_patch(cuser)
         if ndata:
+            ndata["version"] = User.version + 1
             await crud.update(session, where, ndata)
 
         await session.refresh(cuser)
@@ -318,34 +405,33 @@ class TmpResponse:
 
 async def authenticate_user_socket(
     token: str | None = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_session),
     manager: UserSessionManager = Depends(get_usm_token),
 ) -> UserSession:
     if token is None:
         raise BadCredsError()
     request = TmpRequest(token)
     response = TmpResponse(token)
-    return await manager.authenticate(request, response)
+    return await manager.authenticate(session, request, response)
 
 
 async def authenticate_user(
     request: Request,
     response: Response,
     token: str | None = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_session),
     # manager: UserSessionManager = Depends(get_usm),
     manager: UserSessionManager = Depends(get_usm_token),
 ) -> UserSession:
-    user = await manager.authenticate(request, response)
+    """Uses the request-scoped session: FastAPI caches dependencies per
+    request, so the endpoint gets the same session (and connection)"""
+    user = await manager.authenticate(session, request, response)
     return user
 
 
 async def authenticate_superuser(
-    request: Request,
-    response: Response,
-    token: str | None = Depends(oauth2_scheme),
-    # manager: UserSessionManager = Depends(get_usm),
-    manager: UserSessionManager = Depends(get_usm_token),
+    user: UserSession = Depends(authenticate_user),
 ) -> UserSession:
-    user = await authenticate_user(request, response, token, manager)
     if not user.is_super:
         raise NotASuperUserException
     return user
@@ -1,30 +1,131 @@
 from abc import ABC, abstractmethod
+from functools import cache
+import hashlib
 import json
-import logging
-from typing import TYPE_CHECKING
-import requests
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable
 
+import httpx
+from loguru import logger
 from oauthlib.oauth2 import WebApplicationClient
 
-from hmm.auth.schemas import LoginResponse, SudirLoginResponse
-from hmm.config import get_settings
-from hmm.utils.exceptions import (
-    ProviderConnectionError,
-    UnauthorizedUser,
-    UnknownAuthenticationProvider,
-    SudirTokenExpiredError,
-)
-from hmm.schemas.auth import (
+from hmm.config import SudirSettings, get_settings
+from hmm.core.auth.schemas import (
     ExternalUserResponse,
     InnerSudirUserResponse,
     IntrospectResponse,
+    LoginResponse,
     OuterSudirUserResponse,
+    SudirLoginResponse,
 )
+from hmm.core.cache import SingleFlight, TTLCache
+from hmm.core.exceptions import (
+    ProviderConnectionError,
+    UnauthorizedUser,
+    UnknownAuthenticationProvider,
+    SudirTokenExpiredError,
+)
+from hmm.core.http import get_http_client
 
 if TYPE_CHECKING:
-    from hmm.auth.schemas import SudirAuthToken
+    from hmm.core.auth.schemas import SudirAuthToken
+
+
+# * OpenID discovery * #
+
+
+@cache
+def get_discovery_cache(settings_key: str) -> TTLCache:
+    """The document is served for `discovery_ttl` and then for
+    `discovery_stale_ttl` more while it is refreshed in the background"""
+    settings: SudirSettings = getattr(get_settings(), settings_key)
+    return TTLCache(
+        1,
+        settings.discovery_ttl,
+        settings.discovery_stale_ttl,
+        name=f"{settings_key}-discovery",
+    )
+
+
+async def _fetch_discovery_document(http: httpx.AsyncClient, url: str) -> dict:
+    try:
+        response = await http.get(url)
+        response.raise_for_status()
+        return response.json()
+    except Exception as exc:
+        raise ProviderConnectionError(
+            details=dict(
+                error=f"Could not get SUDIR discovery document: {exc!r}"
+            )
+        )
+
 
-logger = logging.getLogger(__name__)
+async def get_discovery_document(
+    http: httpx.AsyncClient, settings_key: str
+) -> dict:
+    url = getattr(get_settings(), settings_key).discovery_url
+    return await get_discovery_cache(settings_key).get_or_load(
+        url,
+        lambda: _fetch_discovery_document(http, url),
+        lambda: _fetch_discovery_document(http, url),
+    )
+
+
+# * Token introspection * #
+
+_INACTIVE = object()
+_introspection_flight = SingleFlight("introspection")
+
+
+@cache
+def get_introspection_cache() -> TTLCache:
+    settings = get_settings().cache
+    return TTLCache(
+        settings.introspection_maxsize,
+        settings.introspection_ttl,
+        name="introspection",
+    )
+
+
+async def _introspect_and_store(
+    key: tuple[str, str],
+    introspect: Callable[[], Awaitable[IntrospectResponse]],
+) -> IntrospectResponse:
+    settings = get_settings().cache
+    cache = get_introspection_cache()
+    try:
+        res = await introspect()
+    except UnauthorizedUser:
+        cache.set(key, _INACTIVE, ttl=settings.introspection_negative_ttl)
+        raise
+    ttl = settings.introspection_ttl
+    if res.exp is not None:
+        ttl = min(ttl, res.exp - time.time())
+    if ttl > 0:
+        cache.set(key, res, ttl=ttl)
+    return res
+
+
+async def cached_introspection(
+    settings_key: str,
+    token: str,
+    introspect: Callable[[], Awaitable[IntrospectResponse]],
+) -> IntrospectResponse:
+    """Introspection results by token hash: active ones until the token
+    `exp` (`introspection_ttl` at most), inactive ones for
+    `introspection_negative_ttl`. Concurrent checks of one token share a
+    single IdP request; connection errors are not cached."""
+    if not get_settings().cache.enabled:
+        return await introspect()
+    key = (settings_key, hashlib.sha256(token.encode()).hexdigest())
+    res = get_introspection_cache().get(key)
+    if res is _INACTIVE:
+        raise UnauthorizedUser(details=dict(error="SUDIR session is inactive"))
+    if res is None:
+        res = await _introspection_flight.do(
+            key, lambda: _introspect_and_store(key, introspect)
+        )
+    return res
 
 
 async def get_auth_provider(auth_provider: str):
@@ -42,15 +143,17 @@ async def get_auth_provider(auth_provider: str):
         except KeyError:
             continue
 
-    raise UnknownAuthenticationProvider(auth_provider)
+    raise UnknownAuthenticationProvider(details=dict(provider=auth_provider))
 
 
 class AuthProvider(ABC):
     """Authentication providers interface"""
 
-    def __init__(self, client_id: str):
+    def __init__(self, client_id: str, http: httpx.AsyncClient | None = None):
         # OAuth 2 client setup
         self.auth_client = WebApplicationClient(client_id)
+        # shared pooled client by default; a stub server client in tests
+        self.http = http or get_http_client()
 
     @staticmethod
     @abstractmethod
@@ -145,9 +248,10 @@ class SudirInnerAuthProvider(AuthProvider):
     requesting user's information via and OpenIdConnect flow.
     """
 
+    settings_key = "sudir_inner"
     settings = get_settings()
     client_id = settings.sudir_inner.client_id
-    client_secret = settings.sudir_inner.client_id
+    client_secret = settings.sudir_inner.client_secret
     redirect_url = settings.sudir_inner.redirect_url
     logout_redirect_url = settings.sudir_inner.logout_redirect_url
 
@@ -167,10 +271,10 @@ class SudirInnerAuthProvider(AuthProvider):
         )
 
         try:
-            token_response = requests.post(
+            token_response = await self.http.post(
                 token_url,
                 headers=headers,
-                data=body,
+                content=body,
                 auth=(self.client_id, self.client_secret),
             )
 
@@ -180,7 +284,9 @@ class SudirInnerAuthProvider(AuthProvider):
 
         except Exception as exc:
             raise ProviderConnectionError(
-                f"Could not get SUDIR access token: {repr(exc)}"
+                details=dict(
+                    error=f"Could not get SUDIR access token: {repr(exc)}"
+                )
             )
 
         return SudirLoginResponse.model_validate(token_response.json())
@@ -189,7 +295,7 @@ class SudirInnerAuthProvider(AuthProvider):
         userinfo_endpoint = await self.get_openid_endpoint("userinfo_endpoint")
         # Request user's information from sudir
         uri, headers, body = self.auth_client.add_token(userinfo_endpoint)
-        userinfo_response = requests.get(uri, headers=headers, data=body)
+        userinfo_response = await self.http.get(uri, headers=headers)
 
         if not userinfo_response.json().get("error"):
             external_user = InnerSudirUserResponse.model_validate(
@@ -197,11 +303,19 @@ class SudirInnerAuthProvider(AuthProvider):
             )
         else:
             raise UnauthorizedUser(
-                userinfo_response.json().get("error_description")
+                details=dict(
+                    error=userinfo_response.json().get("error_description")
+                )
             )
         return external_user
 
     async def check_session_status(self, token: str) -> IntrospectResponse:
+        """Validate user token via introspection service"""
+        return await cached_introspection(
+            self.settings_key, token, lambda: self._introspect(token)
+        )
+
+    async def _introspect(self, token: str) -> IntrospectResponse:
         introspect_endpoint = await self.get_openid_endpoint(
             "introspection_endpoint"
         )
@@ -211,23 +325,27 @@ class SudirInnerAuthProvider(AuthProvider):
         )
 
         try:
-            introspect_response = requests.post(
+            introspect_response = await self.http.post(
                 introspect_url,
                 headers=headers,
-                data=body,
+                content=body,
                 auth=(self.client_id, self.client_secret),
             )
 
         except Exception as exc:
             raise ProviderConnectionError(
-                f"Could not get SUDIR session data: {repr(exc)}"
+                details=dict(
+                    error=f"Could not get SUDIR session data: {repr(exc)}"
+                )
             )
         introspect_response_json = introspect_response.json()
         if (
             introspect_response_json.get("active") is None
             or introspect_response_json.get("active") is False
         ):
-            raise UnauthorizedUser("SUDIR session is inactive")
+            raise UnauthorizedUser(
+                details=dict(error="SUDIR session is inactive")
+            )
 
         return IntrospectResponse.model_validate(introspect_response.json())
 
@@ -241,10 +359,10 @@ class SudirInnerAuthProvider(AuthProvider):
         )
 
         try:
-            token_response = requests.post(
+            token_response = await self.http.post(
                 token_url,
                 headers=headers,
-                data=body,
+                content=body,
                 auth=(self.client_id, self.client_secret),
             )
 
@@ -292,21 +410,14 @@ class SudirInnerAuthProvider(AuthProvider):
             result = discovery_document[endpoint]
         except KeyError as exc:
             raise ProviderConnectionError(
-                f"Could not parse SUDIR discovery document: {repr(exc)}"
+                details=dict(
+                    error=f"Could not parse SUDIR discovery document: {exc!r}"
+                )
             )
         return result
 
     async def _get_discovery_document(self) -> dict:
-        try:
-            discovery_document = requests.get(
-                get_settings().sudir_inner.discovery_url
-            ).json()
-        except Exception as exc:
-            raise ProviderConnectionError(
-                f"Could not get inner SUDIR discovery document: {repr(exc)}"
-            )
-
-        return discovery_document
+        return await get_discovery_document(self.http, self.settings_key)
 
 
 class SudirOuterAuthProvider(AuthProvider):
@@ -314,6 +425,7 @@ class SudirOuterAuthProvider(AuthProvider):
     requesting user's information via and OpenIdConnect flow.
     """
 
+    settings_key = "sudir_outer"
     settings = get_settings()
     client_id = settings.sudir_outer.client_id
     client_secret = settings.sudir_outer.client_secret
@@ -346,10 +458,10 @@ class SudirOuterAuthProvider(AuthProvider):
                 f" {(self.client_id, self.client_secret)=}"
             )
 
-            token_response = requests.post(
+            token_response = await self.http.post(
                 token_url,
                 headers=headers,
-                data=body,
+                content=body,
                 auth=(self.client_id, self.client_secret),
             )
 
@@ -359,7 +471,9 @@ class SudirOuterAuthProvider(AuthProvider):
 
         except Exception as exc:
             raise ProviderConnectionError(
-                f"Could not get SUDIR access token: {repr(exc)}"
+                details=dict(
+                    error=f"Could not get SUDIR access token: {repr(exc)}"
+                )
             )
 
         return SudirLoginResponse.model_validate(token_response.json())
@@ -368,7 +482,7 @@ class SudirOuterAuthProvider(AuthProvider):
         userinfo_endpoint = await self.get_openid_endpoint("userinfo_endpoint")
         # Request user's information from sudir
         uri, headers, body = self.auth_client.add_token(userinfo_endpoint)
-        userinfo_response = requests.get(uri, headers=headers, data=body)
+        userinfo_response = await self.http.get(uri, headers=headers)
 
         if not userinfo_response.json().get("error"):
             external_user = OuterSudirUserResponse.model_validate(
@@ -376,12 +490,19 @@ class SudirOuterAuthProvider(AuthProvider):
             )
         else:
             raise UnauthorizedUser(
-                userinfo_response.json().get("error_description")
+                details=dict(
+                    error=userinfo_response.json().get("error_description")
+                )
             )
         return external_user
 
     async def check_session_status(self, token: str) -> IntrospectResponse:
         """Validate user token via introspection service"""
+        return await cached_introspection(
+            self.settings_key, token, lambda: self._introspect(token)
+        )
+
+    async def _introspect(self, token: str) -> IntrospectResponse:
         introspect_endpoint = await self.get_openid_endpoint(
             "introspection_endpoint"
         )
@@ -391,16 +512,18 @@ class SudirOuterAuthProvider(AuthProvider):
         )
 
         try:
-            introspect_response = requests.post(
+            introspect_response = await self.http.post(
                 introspect_url,
                 headers=headers,
-                data=body,
+                content=body,
                 auth=(self.client_id, self.client_secret),
             )
 
         except Exception as exc:
             raise ProviderConnectionError(
-                f"Could not get SUDIR session data: {repr(exc)}"
+                details=dict(
+                    error=f"Could not get SUDIR session data: {repr(exc)}"
+                )
             )
         logger.info(f"[{self.__class__.__name__}] {introspect_response=}")
         introspect_response_json = introspect_response.json()
@@ -408,7 +531,9 @@ class SudirOuterAuthProvider(AuthProvider):
             introspect_response_json.get("active") is None
             or introspect_response_json.get("active") is False
         ):
-            raise UnauthorizedUser("SUDIR session is inactive")
+            raise UnauthorizedUser(
+                details=dict(error="SUDIR session is inactive")
+            )
         logger.debug(
             f"[{self.__class__.__name__}] {introspect_response_json=}"
         )
@@ -424,10 +549,10 @@ class SudirOuterAuthProvider(AuthProvider):
         )
 
         try:
-            token_response = requests.post(
+            token_response = await self.http.post(
                 token_url,
                 headers=headers,
-                data=body,
+                content=body,
                 auth=(self.client_id, self.client_secret),
             )
 
@@ -477,21 +602,14 @@ class SudirOuterAuthProvider(AuthProvider):
             result = discovery_document[endpoint]
         except KeyError as exc:
             raise ProviderConnectionError(
-                f"Could not parse SUDIR discovery document: {repr(exc)}"
+                details=dict(
+                    error=f"Could not parse SUDIR discovery document: {exc!r}"
+                )
             )
         return result
 
     async def _get_discovery_document(self) -> dict:
-        try:
-            discovery_document = requests.get(
-                get_settings().sudir_outer.discovery_url
-            ).json()
-        except Exception as exc:
-            raise ProviderConnectionError(
-                f"Could not get inner SUDIR discovery document: {repr(exc)}"
-            )
-
-        return discovery_document
+        return await get_discovery_document(self.http, self.settings_key)
 
 
 async def get_outer_sudir_provider() -> SudirOuterAuthProvider:
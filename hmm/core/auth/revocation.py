@@ -0,0 +1,88 @@
+import asyncio
+import time
+from functools import cache
+
+from loguru import logger
+from sqlalchemy import or_, select
+
+from hmm.config import get_settings
+from hmm.core.cache import register_invalidator
+from hmm.core.db import AsyncSessionMaker
+from hmm.models.auth import User
+from hmm.schemas.auth import UserClaims
+
+
+class RevocationList:
+    """In-process view of the users whose stateless tokens may be outdated.
+
+    Holds the current `version` of every user that has ever been changed
+    and the ids of deactivated users. A token is accepted only if its
+    version is current. While the list is not loaded, stale or being
+    reloaded after a local user write, `accepts` returns False and the
+    caller falls back to the db lookup.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._versions: dict[int, int] = {}
+        self._inactive: frozenset[int] = frozenset()
+        self._loaded_at: float | None = None
+        self._dirty = False
+        self._writes = 0
+        self._refreshing: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return (
+            self._loaded_at is not None
+            and not self._dirty
+            and time.monotonic() - self._loaded_at <= 3 * self.interval
+        )
+
+    def accepts(self, claims: UserClaims) -> bool:
+        return (
+            self.ready
+            and claims.is_active
+            and claims.id not in self._inactive
+            and claims.version >= self._versions.get(claims.id, 0)
+        )
+
+    async def refresh(self) -> None:
+        writes = self._writes
+        stmt = select(User.id, User.version, User.is_active).where(
+            or_(User.version > 0, User.is_active.is_(False))
+        )
+        async with AsyncSessionMaker() as session:
+            rows = (await session.execute(stmt)).all()
+        self._versions = {ri.id: ri.version for ri in rows}
+        self._inactive = frozenset(ri.id for ri in rows if not ri.is_active)
+        self._loaded_at = time.monotonic()
+        # a user write committed during the reload keeps the list dirty
+        self._dirty = writes != self._writes
+
+    def _on_tables_changed(self, tables: set[str]) -> None:
+        if User.__tablename__ not in tables:
+            return
+        self._dirty = True
+        self._writes += 1
+        if self._refreshing is None or self._refreshing.done():
+            try:
+                self._refreshing = asyncio.get_running_loop().create_task(
+                    self.refresh()
+                )
+            except RuntimeError:
+                pass
+
+    async def run(self) -> None:
+        register_invalidator(self._on_tables_changed)
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("[Auth] revocation list refresh failed: {}", e)
+            await asyncio.sleep(self.interval)
+
+
+@cache
+def get_revocation_list() -> RevocationList:
+    return RevocationList(get_settings().auth.revocation_refresh)
@@ -1,4 +1,7 @@
 import datetime
+
+from pydantic import ConfigDict
+
 from hmm.schemas.base import CreatedTimeSchemaMixin, OrmModel
 
 
@@ -33,3 +36,33 @@ class InnerTokenCreate(OrmModel):
 class InnerToken(InnerTokenCreate, CreatedTimeSchemaMixin):
     id: int
     created_at: datetime.datetime
+
+
+# * External (OIDC) provider responses * #
+
+
+class IntrospectResponse(OrmModel):
+    model_config = ConfigDict(extra="allow")
+
+    active: bool
+    sub: str | None = None
+    exp: int | None = None
+    client_id: str | None = None
+    scope: str | None = None
+
+
+class ExternalUserResponse(OrmModel):
+    model_config = ConfigDict(extra="allow")
+
+    sub: str
+
+
+class InnerSudirUserResponse(ExternalUserResponse):
+    name: str | None = None
+    email: str | None = None
+
+
+class OuterSudirUserResponse(ExternalUserResponse):
+    name: str | None = None
+    email: str | None = None
+    phone_number: str | None = None
@@ -0,0 +1,94 @@
+"""Cross-process cache invalidation over Postgres `LISTEN/NOTIFY`.
+
+Every transaction that wrote to a table sends a `NOTIFY` with the names of
+the tables just before it commits: Postgres delivers notifications only for
+committed transactions, so the others never see a rolled back write. Each
+worker keeps one `LISTEN` connection and passes the tables to the
+invalidators registered in `hmm.core.cache`. After a (re)connect every
+cache is flushed, as notifications sent while disconnected are lost.
+"""
+
+import asyncio
+import json
+import uuid
+
+import asyncpg
+from loguru import logger
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from hmm.config import get_settings
+from hmm.core.cache import invalidate_tables, written_tables
+from hmm.models.base import Base
+
+# tells this worker's own notifications apart: its caches are already
+# invalidated by the commit itself
+WORKER_ID = uuid.uuid4().hex
+
+
+def _on_before_commit(session: Session) -> None:
+    settings = get_settings().cache
+    if not settings.bus_enabled:
+        return
+    # the tables of the pending objects are known only after the flush
+    session.flush()
+    tables = written_tables(session)
+    if not tables:
+        return
+    payload = json.dumps(dict(worker=WORKER_ID, tables=sorted(tables)))
+    session.execute(select(func.pg_notify(settings.bus_channel, payload)))
+
+
+def install_notify(session_class: type[Session] = Session) -> None:
+    if not event.contains(session_class, "before_commit", _on_before_commit):
+        event.listen(session_class, "before_commit", _on_before_commit)
+
+
+install_notify()
+
+
+def flush_all() -> None:
+    invalidate_tables(Base.metadata.tables.keys())
+
+
+def _on_notification(connection, pid: int, channel: str, payload: str):
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        logger.warning("[Bus] bad payload: {}", payload)
+        return
+    if data.get("worker") == WORKER_ID:
+        return
+    invalidate_tables(data.get("tables", ()))
+
+
+def _listener_dsn() -> str:
+    url = make_url(get_settings().db.db_url).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def listen() -> None:
+    """Keep a `LISTEN` connection open until cancelled"""
+    settings = get_settings().cache
+    while True:
+        closed = asyncio.Event()
+        connection = None
+        try:
+            connection = await asyncpg.connect(_listener_dsn())
+            connection.add_termination_listener(lambda _: closed.set())
+            await connection.add_listener(
+                settings.bus_channel, _on_notification
+            )
+            flush_all()
+            logger.info("[Bus] listening on {}", settings.bus_channel)
+            await closed.wait()
+            logger.warning("[Bus] connection lost")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("[Bus] listener failed: {}", e)
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(settings.bus_reconnect_delay)
@@ -0,0 +1,329 @@
+"""In-process caches for read-mostly values.
+
+Entries are tagged with the table names they were computed from. Writes are
+tracked per session (see `install_write_tracking`) and the touched tables are
+invalidated once the transaction commits.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+from loguru import logger
+from sqlalchemy import Table, event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import visitors
+
+_WRITTEN_TABLES_KEY = "hmm_written_tables"
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: Any
+    fresh_till: float
+    stale_till: float
+    tags: frozenset[str]
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    invalidations: int = 0
+
+
+class TTLCache:
+    """LRU cache with a TTL and a stale-while-revalidate window.
+
+    A value younger than `ttl` is served as is. Up to `stale_ttl` more it is
+    still served, but a single background refresh is scheduled. Older values
+    are loaded inline.
+    """
+
+    def __init__(
+        self, maxsize: int, ttl: float, stale_ttl: float = 0, name: str = ""
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self.stats = CacheStats()
+        self._data: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._by_tag: defaultdict[str, set[Hashable]] = defaultdict(set)
+        self._tag_generation: defaultdict[str, int] = defaultdict(int)
+        self._refreshing: dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _generation(self, tags: Iterable[str]) -> tuple[int, ...]:
+        return tuple(self._tag_generation[ti] for ti in tags)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry.fresh_till < time.monotonic():
+            return default
+        self._data.move_to_end(key)
+        return entry.value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        tags: Iterable[str] = (),
+        ttl: float | None = None,
+    ) -> None:
+        now = time.monotonic()
+        ttl = self.ttl if ttl is None else ttl
+        tags = frozenset(tags)
+        self.pop(key)
+        self._data[key] = _Entry(
+            value, now + ttl, now + ttl + self.stale_ttl, tags
+        )
+        for ti in tags:
+            self._by_tag[ti].add(key)
+        while len(self._data) > self.maxsize:
+            self.pop(next(iter(self._data)))
+
+    def pop(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for ti in entry.tags:
+            keys = self._by_tag.get(ti)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[ti]
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        for ti in tags:
+            self._tag_generation[ti] += 1
+            for key in list(self._by_tag.get(ti, ())):
+                self.pop(key)
+                self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        for ti in list(self._by_tag):
+            self._tag_generation[ti] += 1
+        self._data.clear()
+        self._by_tag.clear()
+
+    def _store(
+        self,
+        key: Hashable,
+        value: Any,
+        tags: frozenset[str],
+        generation: tuple[int, ...],
+    ) -> None:
+        # a write committed while the value was being computed: the value
+        # may already be outdated, so it is returned but not remembered
+        if self._generation(tags) == generation:
+            self.set(key, value, tags)
+
+    async def _load(
+        self, key: Hashable, loader: Loader, tags: frozenset[str]
+    ) -> Any:
+        generation = self._generation(tags)
+        value = await loader()
+        self._store(key, value, tags, generation)
+        return value
+
+    def _schedule_refresh(
+        self, key: Hashable, refresher: Loader, tags: frozenset[str]
+    ) -> None:
+        if key in self._refreshing:
+            return
+
+        async def _refresh():
+            try:
+                await self._load(key, refresher, tags)
+                self.stats.refreshes += 1
+            except Exception as e:
+                logger.warning("[Cache:{}] refresh failed: {}", self.name, e)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(_refresh())
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Loader,
+        refresher: Loader | None = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """`loader` is awaited inline on a miss. `refresher` runs in the
+        background for stale entries, so it must not depend on the request
+        scope (e.g. it has to open its own db session)."""
+        tags = frozenset(tags)
+        entry = self._data.get(key)
+        now = time.monotonic()
+        if entry is not None and now <= entry.stale_till:
+            self._data.move_to_end(key)
+            if now <= entry.fresh_till:
+                self.stats.hits += 1
+                return entry.value
+            if refresher is not None:
+                self.stats.stale_hits += 1
+                self._schedule_refresh(key, refresher, tags)
+                return entry.value
+        self.stats.misses += 1
+        return await self._load(key, loader, tags)
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one.
+
+    The first caller starts `fn` as a task; callers arriving before it is
+    done await the same task. The task is shielded, so a disconnected client
+    does not cancel the work for the others.
+    """
+
+    def __init__(self, name: str = "") -> None:
+        self.name = name
+        self.calls = 0
+        self.shared = 0
+        self._running: dict[Hashable, asyncio.Future] = {}
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._running.get(key) is task:
+            del self._running[key]
+        if not task.cancelled():
+            # mark the exception as retrieved if every waiter has gone
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Loader) -> Any:
+        task = self._running.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._running[key] = task
+            task.add_done_callback(lambda ti: self._forget(key, ti))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    async def do_inline(self, key: Hashable, fn: Loader) -> Any:
+        """Like `do`, but the first caller awaits its own `fn` in place, so
+        `fn` may use resources of the caller (e.g. its db session). If the
+        first caller is cancelled, those waiting start over and one of them
+        runs its own `fn`."""
+        while (future := self._running.get(key)) is not None:
+            self.shared += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+        self.calls += 1
+        future = asyncio.get_running_loop().create_future()
+        self._running[key] = future
+        try:
+            res = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # mark the exception as retrieved if nobody has joined
+            future.exception()
+            raise
+        else:
+            future.set_result(res)
+            return res
+        finally:
+            if self._running.get(key) is future:
+                del self._running[key]
+
+
+# * Invalidation registry * #
+
+_invalidators: list[Callable[[set[str]], None]] = []
+
+
+def register_invalidator(callback: Callable[[set[str]], None]) -> None:
+    """`callback` gets the names of the tables changed by a committed
+    transaction."""
+    if callback not in _invalidators:
+        _invalidators.append(callback)
+
+
+def register_cache(cache: TTLCache) -> TTLCache:
+    register_invalidator(cache.invalidate_tags)
+    return cache
+
+
+def invalidate_tables(tables: Iterable[str]) -> None:
+    tables = set(tables)
+    if not tables:
+        return
+    for callback in _invalidators:
+        try:
+            callback(tables)
+        except Exception as e:
+            logger.warning("[Cache] invalidation failed: {}", e)
+
+
+def statement_tables(stmt: Any) -> set[str]:
+    """Names of all tables referenced by `stmt` (joins and subqueries
+    included)."""
+    return {ni.name for ni in visitors.iterate(stmt) if isinstance(ni, Table)}
+
+
+# * Session write tracking * #
+
+
+def mark_written(session: Any, *tables: str) -> None:
+    """Record a write done bypassing the ORM (e.g. `COPY`)"""
+    session = getattr(session, "sync_session", session)
+    session.info.setdefault(_WRITTEN_TABLES_KEY, set()).update(tables)
+
+
+def written_tables(session: Any) -> set[str]:
+    """Tables written in the current transaction of `session` so far"""
+    session = getattr(session, "sync_session", session)
+    return set(session.info.get(_WRITTEN_TABLES_KEY, ()))
+
+
+def _on_orm_execute(state) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if table is not None:
+            mark_written(state.session, table.name)
+
+
+def _on_after_flush(session: Session, _) -> None:
+    tables = {
+        oi.__table__.name
+        for oi in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(oi, "__table__")
+    }
+    if tables:
+        mark_written(session, *tables)
+
+
+def _on_after_commit(session: Session) -> None:
+    invalidate_tables(session.info.pop(_WRITTEN_TABLES_KEY, ()))
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_WRITTEN_TABLES_KEY, None)
+
+
+def install_write_tracking(session_class: type[Session] = Session) -> None:
+    if event.contains(session_class, "after_commit", _on_after_commit):
+        return
+    event.listen(session_class, "do_orm_execute", _on_orm_execute)
+    event.listen(session_class, "after_flush", _on_after_flush)
+    event.listen(session_class, "after_commit", _on_after_commit)
+    event.listen(session_class, "after_rollback", _on_after_rollback)
+
+
+install_write_tracking()
@@ -1,7 +1,11 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from functools import cache
 from cryptography.fernet import Fernet
 
 from hmm.config import get_settings
+from hmm.core.exceptions import TooManyAuthRequestsError
 from passlib.hash import bcrypt
 
 password_context = bcrypt.using(salt=get_settings().auth.salt, rounds=12)
@@ -15,6 +19,44 @@ def verify_password(password: str, hashed_pass: str) -> bool:
     return password_context.verify(password, hashed_pass)
 
 
+# * Async password operations * #
+
+# bcrypt takes hundreds of ms of CPU: it runs in a separate process pool so
+# the event loop keeps serving other requests
+
+
+@cache
+def get_password_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        get_settings().auth.hash_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+_queued = 0
+
+
+async def _run_in_pool(fn, *args):
+    global _queued
+    if _queued >= get_settings().auth.hash_queue_limit:
+        raise TooManyAuthRequestsError()
+    _queued += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            get_password_pool(), fn, *args
+        )
+    finally:
+        _queued -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run_in_pool(get_hashed_password, password)
+
+
+async def check_password(password: str, hashed_pass: str) -> bool:
+    return await _run_in_pool(verify_password, password, hashed_pass)
+
+
 @cache
 def get_fernet():
     return Fernet(get_settings().auth.real_key)
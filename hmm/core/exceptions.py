@@ -52,6 +52,31 @@ class PasswordError(BaseArgsRestException):
     status = 400
 
 
+class TooManyAuthRequestsError(BaseArgsRestException):
+    message = "Too many authentication requests, try again later"
+    status = 429
+
+
+class UnknownAuthenticationProvider(BaseArgsRestException):
+    message = "Unknown authentication provider"
+    status = 400
+
+
+class ProviderConnectionError(BaseArgsRestException):
+    message = "Authentication provider is unavailable"
+    status = 502
+
+
+class UnauthorizedUser(BaseArgsRestException):
+    message = "Unauthorized"
+    status = 401
+
+
+class SudirTokenExpiredError(BaseArgsRestException):
+    message = "SUDIR token expired"
+    status = 401
+
+
 class NotASuperUserException(BaseArgsRestException):
     message = "User must be a super user"
     status = 403
@@ -67,6 +92,16 @@ class BadCsvFileError(BaseArgsRestException):
     status = 422
 
 
+class BadImportFileError(BaseArgsRestException):
+    message = "Unsupported or broken import file"
+    status = 422
+
+
+class UnknownSubTaskError(BaseArgsRestException):
+    message = "Unknown sub-task id"
+    status = 422
+
+
 class GroupCreationErrorError(BaseArgsRestException):
     message = "GroupCreationErrorError"
     status = 403
@@ -0,0 +1,149 @@
+"""EXPLAIN based checks that the hot queries use the intended indexes.
+
+    python -m hmm.core.explain [--natural]
+
+By default `enable_seqscan` is switched off for the check transaction:
+small dev databases are cheaper to scan, the question is whether the
+index *can* serve the query. `--natural` keeps the planner defaults.
+"""
+
+import asyncio
+import json
+import sys
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+INDEX_NODES = ("Index Only Scan", "Index Scan", "Bitmap Index Scan")
+
+
+@dataclass
+class ExplainCheck:
+    name: str
+    stmt: Select
+    index: str
+    node_types: tuple[str, ...] = INDEX_NODES
+
+
+@dataclass
+class ExplainResult:
+    check: ExplainCheck
+    nodes: list[tuple[str, str | None]]
+
+    @property
+    def ok(self) -> bool:
+        return any(
+            node == ni and self.check.index == index
+            for ni, index in self.nodes
+            for node in self.check.node_types
+        )
+
+
+def plan_nodes(plan: dict) -> Iterator[dict]:
+    yield plan
+    for sub in plan.get("Plans", ()):
+        yield from plan_nodes(sub)
+
+
+async def explain(session: AsyncSession, stmt: Select) -> dict:
+    conn = await session.connection()
+    compiled = stmt.compile(
+        dialect=conn.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    params = compiled.params
+    if compiled.positiontup is not None:
+        params = tuple(params[ki] for ki in compiled.positiontup)
+    res = (
+        await conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled.string}", params
+        )
+    ).scalar()
+    if isinstance(res, str):
+        res = json.loads(res)
+    return res[0]["Plan"]
+
+
+def default_checks() -> list[ExplainCheck]:
+    from hmm.crud.hero import get_hero_crud
+    from hmm.enum import HeroCategory
+    from hmm.models.expedition import SEARCH_CONFIG, ExpeditionTemplate
+    from hmm.models.hero import Hero
+    from hmm.models.tasks.subtask_tasks import TypicalSubTask
+
+    return [
+        ExplainCheck(
+            "autopick candidates",
+            get_hero_crud().candidates_stmt(),
+            "ix_hmm_hero_class_mana",
+            ("Index Only Scan",),
+        ),
+        ExplainCheck(
+            "autopick candidates without busy heroes",
+            get_hero_crud().candidates_stmt([uuid.uuid4(), uuid.uuid4()]),
+            "ix_hmm_hero_class_mana",
+            ("Index Only Scan",),
+        ),
+        ExplainCheck(
+            "hero filter class + lvl + mana",
+            select(Hero).where(
+                Hero.hero_class == HeroCategory.magician,
+                Hero.hero_lvl == 2,
+                Hero.mana >= 10,
+                Hero.mana <= 50,
+            ),
+            "ix_hmm_hero_class_lvl_mana",
+        ),
+        ExplainCheck(
+            "sub-task name ilike",
+            select(TypicalSubTask).where(TypicalSubTask.name.ilike("%боев%")),
+            "ix_hmm_typical_sub_task_name_trgm",
+        ),
+        ExplainCheck(
+            "expedition search",
+            select(ExpeditionTemplate).where(
+                ExpeditionTemplate.search_vector.op("@@")(
+                    func.websearch_to_tsquery(SEARCH_CONFIG, "магия")
+                )
+            ),
+            "ix_hmm_expedition_template_search_vector",
+        ),
+    ]
+
+
+async def run_checks(
+    session: AsyncSession,
+    checks: list[ExplainCheck] | None = None,
+    force_index: bool = True,
+) -> list[ExplainResult]:
+    results = []
+    try:
+        if force_index:
+            await session.execute(text("SET LOCAL enable_seqscan = off"))
+        for ci in checks or default_checks():
+            plan = await explain(session, ci.stmt)
+            nodes = [
+                (ni["Node Type"], ni.get("Index Name"))
+                for ni in plan_nodes(plan)
+            ]
+            results.append(ExplainResult(ci, nodes))
+    finally:
+        await session.rollback()
+    return results
+
+
+async def main(force_index: bool = True) -> int:
+    from hmm.core.db import AsyncSessionMaker
+
+    async with AsyncSessionMaker() as session:
+        results = await run_checks(session, force_index=force_index)
+    for ri in results:
+        status = "OK  " if ri.ok else "FAIL"
+        print(f"{status} {ri.check.name}: {ri.nodes}")
+    return 0 if all(ri.ok for ri in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(force_index="--natural" not in sys.argv)))
@@ -1,8 +1,19 @@
-from typing import TYPE_CHECKING, Any, Iterable, Optional, Type, Union
-
-from fastapi import Depends
+import inspect
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Iterable,
+    Optional,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from fastapi import Depends, Query
 from pydantic import BaseModel, create_model
 from pydantic.fields import FieldInfo
+from pydantic_core import PydanticUndefined
 from sqlalchemy import Select
 
 
@@ -33,12 +44,23 @@ class BaseFilterModel(BaseModel, extra="forbid"):
         raise NotImplementedError()
 
 
+def _is_list_field(name: str) -> bool:
+    return name.endswith("__in") or name.endswith("__not_in")
+
+
 def _get_annotation(name: str, field: FieldInfo):
     annon = field.annotation
+    if _is_list_field(name):
+        # `?id__in=1&id__in=2`: always a list query param
+        args = [
+            ai for ai in get_args(annon) or (annon,) if ai is not type(None)
+        ]
+        item = args[0] if len(args) == 1 else Union[tuple(args)]
+        if get_origin(item) is not list:
+            item = list[item]
+        return item | None
     if not field.is_required():
         annon = annon | None
-    if name.endswith("__in") or name.endswith("__not_in"):
-        annon = annon | list[field.annotation]
     return annon
 
 
@@ -56,15 +78,40 @@ def FilterDepends(  # pragma: no cover
     by_alias: bool = False,
     use_cache: bool = True,
 ) -> Any:
+    """Query params model: a subclass of `Filter` (only the annotations are
+    widened), so it filters itself without being copied back.
+
+    With `by_alias` the query params are named after the field aliases."""
     fields = _list_to_str_fields(Filter)
     GeneratedFilter: Type[BaseFilterModel] = create_model(
-        Filter.__class__.__name__, **fields
+        Filter.__name__, __base__=Filter, **fields
     )
 
-    class FilterWrapper(GeneratedFilter):  # type: ignore[misc,valid-type]
-        def filter(self: "FilterWrapper | BaseFilterModel", *args, **kwargs):
-            d = self.model_dump(mode="python", by_alias=by_alias)
-            original_filter = Filter.model_construct(**d)
-            return original_filter.filter(*args, **kwargs)
-
-    return Depends(FilterWrapper, use_cache=use_cache)
+    # explicit `Query` defaults: FastAPI would read list params as a body
+    params = []
+    # pydantic validates a field with an alias by the alias
+    init_keys = {}
+    for name, (annotation, field) in fields.items():
+        default = field.default
+        if default is PydanticUndefined:
+            default = ...
+        alias = field.alias if by_alias else None
+        params.append(
+            inspect.Parameter(
+                name,
+                inspect.Parameter.KEYWORD_ONLY,
+                annotation=annotation,
+                default=Query(
+                    default, alias=alias, description=field.description
+                ),
+            )
+        )
+        init_keys[name] = field.alias or name
+
+    def filter_dependency(**kwargs) -> GeneratedFilter:
+        return GeneratedFilter(
+            **{init_keys[ki]: vi for ki, vi in kwargs.items()}
+        )
+
+    filter_dependency.__signature__ = inspect.Signature(params)
+    return Depends(filter_dependency, use_cache=use_cache)
@@ -1,10 +1,13 @@
+import operator
 from collections import namedtuple
-from typing import Any, Callable, TypeAlias
+from functools import partial
+from typing import Any, Callable, ClassVar, TypeAlias, get_args, get_origin
 from warnings import warn
-from loguru import logger
 
 from sqlalchemy.sql.selectable import Select
 
+from hmm.core.utils.sql import in_array, not_in_array
+
 from .base import BaseFilterModel
 
 prepared_notify_filters = namedtuple(
@@ -34,34 +37,37 @@ def _backward_compatible_value_for_like_and_ilike(value: str):
     return value
 
 
-MethodAndValued: TypeAlias = tuple[str, Any]
-GetMethodAndValued: TypeAlias = Callable[[str], MethodAndValued]
 FrontMethod: TypeAlias = str
-_orm_operator_transformer: dict[FrontMethod, GetMethodAndValued] = {
-    "eq": lambda value: ("__eq__", value),
-    "neq": lambda value: ("__ne__", value),
-    "gt": lambda value: ("__gt__", value),
-    "gte": lambda value: ("__ge__", value),
-    "isnull": lambda value: (
-        ("is_", None) if value is True else ("is_not", None)
+ColumnOperator: TypeAlias = Callable[[Any, Any], Any]
+_orm_operators: dict[FrontMethod, ColumnOperator] = {
+    "eq": operator.eq,
+    "neq": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "isnull": lambda column, value: (
+        column.is_(None) if value is True else column.is_not(None)
     ),
-    "lt": lambda value: ("__lt__", value),
-    "lte": lambda value: ("__le__", value),
-    "from": lambda value: ("__ge__", value),
-    "till": lambda value: ("__le__", value),
-    "like": lambda value: (
-        "like",
-        _backward_compatible_value_for_like_and_ilike(value),
+    "lt": operator.lt,
+    "lte": operator.le,
+    "from": operator.ge,
+    "till": operator.le,
+    "like": lambda column, value: column.like(
+        _backward_compatible_value_for_like_and_ilike(value)
     ),
-    "ilike": lambda value: (
-        "ilike",
-        _backward_compatible_value_for_like_and_ilike(value),
+    "ilike": lambda column, value: column.ilike(
+        _backward_compatible_value_for_like_and_ilike(value)
     ),
-    "not": lambda value: ("is_not", value),
-    "in": lambda value: ("in_", value),
-    "not_in": lambda value: ("not_in", value),
+    # pg_trgm similarity (`pg_trgm.similarity_threshold`)
+    "similar": lambda column, value: column.op("%")(value),
+    "not": lambda column, value: column.is_not(value),
+    "in": lambda column, value: in_array(column, value),
+    "not_in": lambda column, value: not_in_array(column, value),
 }
 
+# (filter, value) -> where clause
+PlanItem: TypeAlias = Callable[["Filter", Any], Any]
+_NESTED = object()
+
 
 class Filter(BaseFilterModel):
     """Base filter for orm related filters.
@@ -91,39 +97,63 @@ class Filter(BaseFilterModel):
             name__isnull: Optional[bool]
     """
 
-    def parse_field(self, cur_field: str) -> tuple[str, GetMethodAndValued]:
+    _plan: ClassVar[dict[str, PlanItem]] = {}
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        if getattr(cls.Constants, "model", None) is not None:
+            cls._plan = cls._compile_plan()
+
+    @classmethod
+    def parse_field(cls, cur_field: str) -> tuple[str, ColumnOperator]:
         splits = cur_field.rsplit("__", 1)
-        if len(splits) == 1:
-            return (
-                splits[0],
-                _orm_operator_transformer["eq"],
-            )  # default operator
-        return splits[0], _orm_operator_transformer[splits[1]]
-
-    def simple_filter(
-        self, stmt: Select, cur_field: str, filtering_fields: dict[str, Any]
-    ) -> Select:
-        # Reduse func calls with simple copying this code to the call place
-        field_name, mfunc = self.parse_field(cur_field)
-        operation, value = mfunc(filtering_fields[cur_field])
-
-        func_filter = getattr(self, f"criteria_{cur_field}", None)
-        if func_filter is not None:
-            stmt = stmt.filter(func_filter(value))
-        elif field_name in self.Constants.search_model_fields:
-            model_column = getattr(self.Constants.model, field_name)
-            stmt = stmt.filter(getattr(model_column, operation)(value))
-        return stmt
+        if len(splits) == 1 or splits[1] not in _orm_operators:
+            return cur_field, _orm_operators["eq"]  # default operator
+        return splits[0], _orm_operators[splits[1]]
+
+    @classmethod
+    def _compile_plan(cls) -> dict[str, PlanItem]:
+        """Field name -> criteria once per class: the request only loops
+        over the set fields"""
+        search_model_fields = set(cls.Constants.search_model_fields)
+        plan: dict[str, PlanItem] = {}
+        for name, field in cls.model_fields.items():
+            if func_filter := getattr(cls, f"criteria_{name}", None):
+                plan[name] = func_filter
+                continue
+            annotations = get_args(field.annotation) or (field.annotation,)
+            # `list[int]` is an instance of `type` before python 3.11
+            if any(
+                isinstance(ai, type)
+                and get_origin(ai) is None
+                and issubclass(ai, Filter)
+                for ai in annotations
+            ):
+                plan[name] = _NESTED
+                continue
+            field_name, column_operator = cls.parse_field(name)
+            if field_name not in search_model_fields:
+                continue
+            model_column = getattr(cls.Constants.model, field_name)
+            plan[name] = partial(
+                _apply_operator, column_operator, model_column
+            )
+        return plan
 
     def filter(self, stmt: Select):
-        filtering_fields = self.filtering_fields
-        logger.debug("Filtering fields: {}", filtering_fields)
-        for origfield_name in filtering_fields.keys():
-            filter_field = getattr(self, origfield_name)
-            if isinstance(filter_field, Filter):
-                stmt = filter_field.filter(stmt)
+        plan = self._plan
+        for name, value in self:
+            if value is None or (item := plan.get(name)) is None:
+                continue
+            if item is _NESTED:
+                stmt = value.filter(stmt)
             else:
-                stmt = self.simple_filter(
-                    stmt, origfield_name, filtering_fields
-                )
+                stmt = stmt.filter(item(self, value))
         return stmt
+
+
+def _apply_operator(
+    column_operator: ColumnOperator, column: Any, _: Filter, value: Any
+):
+    return column_operator(column, value)
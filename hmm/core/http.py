@@ -0,0 +1,27 @@
+from functools import cache
+
+import httpx
+
+from hmm.config import get_settings
+
+
+@cache
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide client: keeps the connection pool (and TLS sessions) to
+    external services between requests"""
+    settings = get_settings().http
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            settings.timeout, connect=settings.connect_timeout
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+        ),
+    )
+
+
+async def close_http_client() -> None:
+    if get_http_client.cache_info().currsize:
+        await get_http_client().aclose()
+        get_http_client.cache_clear()
@@ -92,6 +92,7 @@ def OrderDepends(order: "Ordering"):
     OrderEnum = Enum(
         f"{cls.__name__}_{_model.__class__.__name__}_OrderEnum", fs
     )
+    _plan = cls.compile_plan(_model, _fields)
     if order._enable_docs:
 
         def order_func(
@@ -102,6 +103,7 @@ def OrderDepends(order: "Ordering"):
             res = cls(_model)
             res.fields = _fields
             res._default_sort = _default_sort
+            res._plan = _plan
             return res(sort_by)
 
     else:
@@ -110,6 +112,7 @@ def OrderDepends(order: "Ordering"):
             res = cls(_model)
             res.fields = _fields
             res._default_sort = _default_sort
+            res._plan = _plan
             return res()
 
     return Depends(order_func, use_cache=True)
@@ -133,12 +136,56 @@ class Ordering:
         self._order_fields = order_fields
         self._default_order_fields = default_order_fields
         self.fields: set[str] = set()
+        # "+field" / "-field" -> (parsed sort item, ORDER BY clause)
+        self._plan: dict[str, tuple[dict[str, str], Any]] = {}
+
+    @classmethod
+    def compile_plan(
+        cls, model: "type[Base]", fields: Iterable[str]
+    ) -> dict[str, tuple[dict[str, str], Any]]:
+        plan = {}
+        for fi in fields:
+            column = getattr(model, fi, None)
+            for order, convert in cls.ACS_DESC_CONVERT.items():
+                if column is not None:
+                    clause = convert(column)
+                else:
+                    clause = sa.text(
+                        f"{fi} {cls.ACS_DESC_TEXT_CONVERT[order]}"
+                    )
+                plan[order + fi] = (dict(order=order, field=fi), clause)
+        return plan
+
+    def _sort_from_plan(self, sort_by: list[Enum | str]) -> list[dict]:
+        ret_list = []
+        field_set = set()
+        for s in sort_by:
+            s = s.value if isinstance(s, Enum) else s
+            if s == "--":
+                # Swagger skip
+                continue
+            if (item := self._plan.get(s)) is None:
+                # not a known token: `_sort` raises the detailed error
+                return _sort(sort_by, self.fields)
+            if (field := item[0]["field"]) in field_set:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"the sort {field=} occurs several times",
+                )
+            field_set.add(field)
+            ret_list.append(item[0])
+        return ret_list
 
     def __call__(self, sort_by: QueryListOfString = []):
-        self.sort_by = _sort(sort_by, self.fields) or self._default_sort
+        if self._plan:
+            self.sort_by = self._sort_from_plan(sort_by) or self._default_sort
+        else:
+            self.sort_by = _sort(sort_by, self.fields) or self._default_sort
         return self
 
     def _build_order_fields(self, sort_by: Iterable[dict]):
+        if self._plan:
+            return [self._plan[si["order"] + si["field"]][1] for si in sort_by]
         end = []
         for si in sort_by:
             if hasattr(self._model, si["field"]):
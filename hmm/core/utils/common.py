@@ -1,7 +1,8 @@
 import datetime
 import re
 from functools import cache
-from typing import Any, TypeVar
+from itertools import islice
+from typing import Any, Iterable, Iterator, TypeVar
 
 import loguru
 from sqlalchemy import BinaryExpression
@@ -9,6 +10,7 @@ from sqlalchemy.orm import InstrumentedAttribute
 from pydantic.json_schema import GetJsonSchemaHandler
 from pydantic_core import core_schema
 
+T = TypeVar("T")
 FilterType = TypeVar(
     "FilterType",
     list[str],
@@ -94,3 +96,10 @@ def convert_time(time_str: str) -> float:
 @cache
 def utc_offset():
     return datetime.datetime.now() - datetime.datetime.utcnow()
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split any iterable (generators too) into lists of `size` items"""
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
@@ -0,0 +1,20 @@
+from collections.abc import Iterable
+from typing import Any
+
+from sqlalchemy import all_, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+def _array_param(column: Any, values: Iterable):
+    return bindparam(None, list(values), type_=ARRAY(column.type))
+
+
+def in_array(column: Any, values: Iterable):
+    """`column = ANY(:array)`: one typed array parameter instead of a bind
+    parameter per value as `IN (...)` does"""
+    return column == any_(_array_param(column, values))
+
+
+def not_in_array(column: Any, values: Iterable):
+    """`column <> ALL(:array)`"""
+    return column != all_(_array_param(column, values))
@@ -1,12 +1,21 @@
 from functools import cache
 
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from hmm.models.auth import User
 from hmm.crud.base import CRUDBase
 from hmm.schemas.auth import UserCreate, UserSession
 
 
 class UserCrud(CRUDBase[User, UserSession, UserCreate]):
-    pass
+
+    async def create(
+        self, session: AsyncSession, *, obj_in: dict | UserCreate
+    ) -> User:
+        """Hashes the password in the password process pool"""
+        if isinstance(obj_in, UserCreate):
+            obj_in = await obj_in.with_hash()
+        return await super().create(session, obj_in=obj_in)
 
 
 @cache
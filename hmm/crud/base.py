@@ -1,10 +1,26 @@
+import hashlib
+import struct
+import time
+from collections import defaultdict
 from collections.abc import Iterable
+from enum import Enum
 from functools import wraps
 from typing import Any, TypeVar, Generic, TypeAlias, Callable, Awaitable
 
 import loguru
-from pydantic import BaseModel
-from sqlalchemy import select, delete, update, func
+from pydantic import BaseModel, Field, computed_field
+from sqlalchemy import (
+    Column,
+    Float,
+    UniqueConstraint,
+    select,
+    delete,
+    update,
+    func,
+    insert,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.engine.cursor import CursorResult
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,12 +28,16 @@ from sqlalchemy.sql import Select
 from sqlalchemy.sql.elements import OperatorExpression, UnaryExpression
 
 from hmm.config import get_settings, Settings
+from hmm.core.cache import mark_written
+from hmm.core.utils.common import chunked
 from hmm.models.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 GetSchemaType = TypeVar("GetSchemaType", bound=BaseModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 
+PG_MAX_BIND_PARAMS = 32767
+
 
 CRUDBaseCommonMethodType: TypeAlias = (
     Callable[
@@ -28,10 +48,39 @@ CRUDBaseCommonMethodType: TypeAlias = (
 )
 
 
+def relationship_tables(*attrs: Any) -> tuple[str, ...]:
+    """Tables an eager load of each relationship attribute reads"""
+    tables = []
+    for ai in attrs:
+        prop = ai.property
+        if prop.secondary is not None:
+            tables.append(prop.secondary.name)
+        tables.append(prop.mapper.local_table.name)
+    return tuple(tables)
+
+
 class NoResultFoundEx(Exception):
     pass
 
 
+class BulkCreateResult(BaseModel):
+    count: int = 0
+    elapsed: float = 0
+    objs: list[Any] = Field(default_factory=list, exclude=True)
+
+    @computed_field
+    @property
+    def rows_per_second(self) -> float:
+        if not self.elapsed:
+            return 0
+        return self.count / self.elapsed
+
+
+class BulkSyncResult(BulkCreateResult):
+    updated: int = 0
+    unchanged: int = 0
+
+
 def map_to_schema_result(func) -> ():
     @wraps(func)
     async def wrapper(*args, **kwargs):
@@ -53,6 +102,9 @@ UpdateFilter: TypeAlias = (
 
 
 class CRUDBase(Generic[ModelType, GetSchemaType, CreateSchemaType]):
+    # fields identifying a row for `sync_many`
+    natural_key: tuple[str, ...] = ()
+
     def __init__(self, settings: Settings = None):
         self._settings = settings or get_settings()
 
@@ -86,8 +138,16 @@ class CRUDBase(Generic[ModelType, GetSchemaType, CreateSchemaType]):
         return select(self._model)
 
     @property
-    def _has_custom_base(self):
-        return self._select_model != select(self._model)
+    def version_tables(self) -> tuple[str, ...]:
+        """Tables read by `_select_model` that don't show up in the statement
+        itself (eager loaded relationships): they make part of the list
+        `ETag`"""
+        return ()
+
+    @property
+    def _has_custom_base(self) -> bool:
+        # `Select` objects don't compare by value, check for an override
+        return type(self)._select_model is not CRUDBase._select_model
 
     def _resolve_filter(
         self, filter_: UpdateFilter
@@ -210,6 +270,92 @@ class CRUDBase(Generic[ModelType, GetSchemaType, CreateSchemaType]):
             await session.refresh(model)
         return models
 
+    @staticmethod
+    def _obj_in_to_dict(obj_in: dict | CreateSchemaType) -> dict:
+        if isinstance(obj_in, BaseModel):
+            return obj_in.model_dump(exclude_unset=True, exclude_none=True)
+        return obj_in
+
+    def _fill_python_defaults(self, row: dict) -> dict:
+        """COPY skips SQLAlchemy column defaults (e.g. `uuid4` ids),
+        so they are evaluated here. Server defaults are left to Postgres"""
+        for column in self._model.__table__.columns:
+            default = column.default
+            if default is None or column.key in row:
+                continue
+            if default.is_callable:
+                row[column.key] = default.arg(None)
+            elif default.is_scalar:
+                row[column.key] = default.arg
+        return row
+
+    async def _copy_records(
+        self, session: AsyncSession, columns: list[str], rows: list[dict]
+    ) -> None:
+        conn = await session.connection()
+        raw = await conn.get_raw_connection()
+        if not raw.driver_connection.is_in_transaction():
+            # the asyncpg adapter sends BEGIN lazily, with the first
+            # statement: COPY would run (and commit) outside of the session
+            # transaction
+            await conn.exec_driver_sql("SELECT 1")
+        await raw.driver_connection.copy_records_to_table(
+            self._model.__tablename__,
+            records=[tuple(ri[ci] for ci in columns) for ri in rows],
+            columns=columns,
+        )
+        mark_written(session, self._model.__tablename__)
+
+    async def _insert_returning(
+        self, session: AsyncSession, rows: list[dict]
+    ) -> list[ModelType]:
+        stmt = insert(self._model).returning(
+            self._model, sort_by_parameter_order=True
+        )
+        return (await session.scalars(stmt, rows)).all()
+
+    async def bulk_create(
+        self,
+        session: AsyncSession,
+        data: Iterable[dict | CreateSchemaType],
+        *,
+        returning: bool = False,
+        chunk_size: int | None = None,
+    ) -> BulkCreateResult:
+        """Stream rows into the table in chunks.
+
+        Rows go through `COPY` (asyncpg `copy_records_to_table`) unless
+        `returning` is set or a chunk has rows with different keys - then a
+        multi-row `INSERT ... RETURNING` is used and the created objects are
+        collected in `result.objs`.
+        """
+        chunk_size = chunk_size or self._settings.app.BULK_CHUNK_SIZE
+        result = BulkCreateResult()
+        started = time.perf_counter()
+        for chunk in chunked(data, chunk_size):
+            rows = [
+                self._fill_python_defaults(dict(self._obj_in_to_dict(oi)))
+                for oi in chunk
+            ]
+            columns = list(rows[0])
+            homogeneous = all(ri.keys() == rows[0].keys() for ri in rows)
+            if returning or not homogeneous:
+                objs = await self._insert_returning(session, rows)
+                if returning:
+                    result.objs.extend(objs)
+            else:
+                await self._copy_records(session, columns, rows)
+            result.count += len(rows)
+        result.elapsed = time.perf_counter() - started
+        loguru.logger.info(
+            "[{}] bulk_create: {} rows in {:.3f}s ({:.0f} rows/s)",
+            self.__class__.__name__,
+            result.count,
+            result.elapsed,
+            result.rows_per_second,
+        )
+        return result
+
     def _get_by_pk_expression(self, db_obj: ModelType):
         pk_name = getattr(db_obj, "pk_name", "id")
         pk_column = getattr(self.model, pk_name)
@@ -219,14 +365,11 @@ class CRUDBase(Generic[ModelType, GetSchemaType, CreateSchemaType]):
     async def create(
         self, session: AsyncSession, *, obj_in: dict | CreateSchemaType
     ) -> ModelType:
-        obj_in_data = obj_in
-        if isinstance(obj_in_data, BaseModel):
-            obj_in_data = obj_in.model_dump(
-                exclude_unset=True, exclude_none=True
-            )
-        db_obj = self._model(**obj_in_data)  # type: ignore
-        session.add(db_obj)
-        await session.flush([db_obj])
+        """`INSERT ... RETURNING`: server defaults come back with the insert.
+        Only CRUDs with a custom `_select_model` re-fetch the object"""
+        obj_in_data = self._obj_in_to_dict(obj_in)
+        stmt = insert(self._model).values(**obj_in_data).returning(self._model)
+        db_obj = (await session.scalars(stmt)).one()
         if not self._has_custom_base:
             return db_obj
 
@@ -240,13 +383,7 @@ class CRUDBase(Generic[ModelType, GetSchemaType, CreateSchemaType]):
     ) -> GetSchemaType:
         db_obj = await self.create(session, obj_in=obj_in)
         await session.commit()
-        await session.refresh(db_obj)
-        if not self._has_custom_base:
-            return db_obj
-        res = await self.get_one_raw(
-            session, operator_expressions=self._get_by_pk_expression(db_obj)
-        )
-        return res
+        return db_obj
 
     async def update(
         self,
@@ -269,6 +406,62 @@ class CRUDBase(Generic[ModelType, GetSchemaType, CreateSchemaType]):
         result: CursorResult = await session.execute(update_stmt)
         return result.rowcount
 
+    def _unique_keys(self) -> list[set[str]]:
+        table = self._model.__table__
+        keys = [{c.key for c in table.primary_key.columns}]
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint):
+                keys.append({c.key for c in constraint.columns})
+        for index in table.indexes:
+            if index.unique:
+                keys.append({c.key for c in index.columns})
+        return keys
+
+    def _conflict_target(self, filter_fields: Iterable[str]) -> list[str]:
+        """`filter_fields` as an `ON CONFLICT` target (empty if they don't
+        match the primary key or any unique constraint / index)"""
+        filter_fields = list(filter_fields)
+        if set(filter_fields) in self._unique_keys():
+            return filter_fields
+        return []
+
+    def _upsert_stmt(
+        self,
+        rows: list[dict],
+        conflict_target: list[str],
+        returning: bool = True,
+    ):
+        stmt = pg_insert(self._model).values(rows)
+        pk = {c.key for c in self._model.__table__.primary_key.columns}
+        set_ = {
+            k: stmt.excluded[k]
+            for k in rows[0]
+            if k not in conflict_target and k not in pk
+        }
+        if not set_:
+            # DO NOTHING returns no row for the existing object
+            set_ = {k: stmt.excluded[k] for k in conflict_target}
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_target, set_=set_
+        )
+        if not returning:
+            return stmt
+        return stmt.returning(self._model).execution_options(
+            populate_existing=True
+        )
+
+    async def _select_upsert(
+        self, session: AsyncSession, filter_dict: dict, obj_in: dict
+    ) -> ModelType:
+        try:
+            exist_model = await self.get_one_raw(session, **filter_dict)
+            for field, value in obj_in.items():
+                setattr(exist_model, field, value)
+            await session.flush([exist_model])
+            return exist_model
+        except NoResultFound:
+            return await self.create(session, obj_in=obj_in)
+
     async def upsert_an_obj(
         self,
         session,
@@ -281,15 +474,158 @@ class CRUDBase(Generic[ModelType, GetSchemaType, CreateSchemaType]):
         if not filter_dict:
             loguru.logger.warning("Got empty filter dict - force insert")
             return await self.create(session, obj_in=obj_in)
-        else:
-            try:
-                exist_model = await self.get_one_raw(session, **filter_dict)
-                for field, value in obj_in.items():
-                    setattr(exist_model, field, value)
-                await session.flush([exist_model])
-                return exist_model
-            except NoResultFound:
-                return await self.create(session, obj_in=obj_in)
+        conflict_target = self._conflict_target(filter_dict)
+        if not conflict_target:
+            loguru.logger.warning(
+                "{} is not a unique key of {} - select based upsert",
+                list(filter_dict),
+                self._model.__tablename__,
+            )
+            return await self._select_upsert(session, filter_dict, obj_in)
+        stmt = self._upsert_stmt([obj_in], conflict_target)
+        return (await session.scalars(stmt)).one()
+
+    async def upsert_many(
+        self,
+        session: AsyncSession,
+        filter_fields: list[str],
+        objs_in: Iterable[dict | CreateSchemaType],
+        *,
+        returning: bool = False,
+        chunk_size: int | None = None,
+    ) -> BulkCreateResult:
+        """`INSERT ... ON CONFLICT DO UPDATE` for many objects: one statement
+        per chunk. `filter_fields` must be a unique key of the model"""
+        conflict_target = self._conflict_target(filter_fields)
+        if not conflict_target:
+            raise ValueError(
+                f"{filter_fields} is not a unique key of"
+                f" {self._model.__tablename__}"
+            )
+        chunk_size = chunk_size or self._settings.app.BULK_CHUNK_SIZE
+        result = BulkCreateResult()
+        started = time.perf_counter()
+        for chunk in chunked(objs_in, chunk_size):
+            # ON CONFLICT DO UPDATE can't affect the same row twice
+            unique_rows: dict[tuple, dict] = {}
+            for oi in chunk:
+                row = self._fill_python_defaults(
+                    dict(self._obj_in_to_dict(oi))
+                )
+                unique_rows[tuple(row[k] for k in conflict_target)] = row
+            groups: dict[frozenset, list[dict]] = defaultdict(list)
+            for row in unique_rows.values():
+                groups[frozenset(row)].append(row)
+            for keys, rows in groups.items():
+                max_rows = PG_MAX_BIND_PARAMS // len(keys)
+                for part in chunked(rows, max_rows):
+                    stmt = self._upsert_stmt(part, conflict_target, returning)
+                    if returning:
+                        result.objs.extend((await session.scalars(stmt)).all())
+                    else:
+                        await session.execute(stmt)
+            result.count += len(unique_rows)
+        result.elapsed = time.perf_counter() - started
+        loguru.logger.info(
+            "[{}] upsert_many: {} rows in {:.3f}s ({:.0f} rows/s)",
+            self.__class__.__name__,
+            result.count,
+            result.elapsed,
+            result.rows_per_second,
+        )
+        return result
+
+    @staticmethod
+    def _normalize(column: Column, value: Any) -> Any:
+        if isinstance(value, Enum):
+            return value.value
+        if isinstance(column.type, Float) and isinstance(value, (int, float)):
+            if (column.type.precision or 53) <= 24:
+                # REAL column: compare with what Postgres actually stores
+                return struct.unpack("f", struct.pack("f", value))[0]
+            return float(value)
+        return value
+
+    def _fingerprint(self, row: dict, fields: Iterable[str]) -> str:
+        columns = self._model.__table__.columns
+        values = tuple(
+            (fi, self._normalize(columns[fi], row[fi]))
+            for fi in sorted(fields)
+        )
+        return hashlib.blake2b(
+            repr(values).encode(), digest_size=16
+        ).hexdigest()
+
+    async def _get_by_natural_key(
+        self, session: AsyncSession, keys: list[tuple]
+    ) -> dict[tuple, dict]:
+        """Stored rows for `keys`: one `(k1, k2, ...) IN (...)` query per
+        bind-limit chunk. Of duplicated rows the first one is taken"""
+        key_columns = [getattr(self._model, ki) for ki in self.natural_key]
+        stored: dict[tuple, dict] = {}
+        for part in chunked(keys, PG_MAX_BIND_PARAMS // len(key_columns)):
+            stmt = select(*self._model.__table__.columns).where(
+                tuple_(*key_columns).in_(part)
+            )
+            for row in (await session.execute(stmt)).mappings():
+                key = tuple(row[ki] for ki in self.natural_key)
+                stored.setdefault(key, dict(row))
+        return stored
+
+    async def sync_many(
+        self,
+        session: AsyncSession,
+        objs_in: Iterable[dict | CreateSchemaType],
+        *,
+        chunk_size: int | None = None,
+    ) -> BulkSyncResult:
+        """Write only the difference with the stored rows.
+
+        Rows are matched by `natural_key` and compared by a fingerprint of
+        the other given fields: new rows go to `bulk_create`, changed ones
+        are updated by primary key in one executemany, the rest is skipped.
+        """
+        if not self.natural_key:
+            raise ValueError(f"{self.__class__.__name__} has no natural_key")
+        chunk_size = chunk_size or self._settings.app.BULK_CHUNK_SIZE
+        pk = [c.key for c in self._model.__table__.primary_key.columns]
+        result = BulkSyncResult()
+        started = time.perf_counter()
+        for chunk in chunked(objs_in, chunk_size):
+            rows: dict[tuple, dict] = {}
+            for oi in chunk:
+                row = dict(self._obj_in_to_dict(oi))
+                rows[tuple(row[ki] for ki in self.natural_key)] = row
+            stored = await self._get_by_natural_key(session, list(rows))
+            to_insert, to_update = [], []
+            for key, row in rows.items():
+                db_row = stored.get(key)
+                if db_row is None:
+                    to_insert.append(row)
+                    continue
+                content = [fi for fi in row if fi not in self.natural_key]
+                if self._fingerprint(row, content) == self._fingerprint(
+                    db_row, content
+                ):
+                    result.unchanged += 1
+                else:
+                    to_update.append(row | {ki: db_row[ki] for ki in pk})
+            if to_insert:
+                created = await self.bulk_create(session, to_insert)
+                result.count += created.count
+            if to_update:
+                await session.execute(update(self._model), to_update)
+                result.updated += len(to_update)
+        result.elapsed = time.perf_counter() - started
+        loguru.logger.info(
+            "[{}] sync_many: {} inserted, {} updated, {} unchanged in {:.3f}s",
+            self.__class__.__name__,
+            result.count,
+            result.updated,
+            result.unchanged,
+            result.elapsed,
+        )
+        return result
 
     async def get_or_create(
         self,
@@ -305,10 +641,24 @@ class CRUDBase(Generic[ModelType, GetSchemaType, CreateSchemaType]):
             raise ValueError(
                 f"Got empty filter dict in CRUD={self.__class__.__name__}"
             )
-        try:
-            return await self.get_one_raw(session, **filter_dict)
-        except NoResultFound:
-            return await self.create(session, obj_in=obj_in)
+        conflict_target = self._conflict_target(filter_dict)
+        if not conflict_target:
+            try:
+                return await self.get_one_raw(session, **filter_dict)
+            except NoResultFound:
+                return await self.create(session, obj_in=obj_in)
+        stmt = (
+            pg_insert(self._model)
+            .values(**obj_in)
+            .on_conflict_do_nothing(index_elements=conflict_target)
+            .returning(self._model)
+        )
+        db_obj = (await session.scalars(stmt)).one_or_none()
+        if db_obj is None:
+            # The row already exists (maybe committed by a concurrent
+            # transaction) - a new statement sees it
+            db_obj = await self.get_one_raw(session, **filter_dict)
+        return db_obj
 
     async def bump_last_modified(
         self, session: AsyncSession, *, row_filter
@@ -3,18 +3,22 @@ from typing import TYPE_CHECKING
 import uuid
 from sqlalchemy import insert, select
 from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from hmm.enum import ExpeditionStatus
 from hmm.models.expedition import ExpeditionTemplate
-from hmm.crud.base import CRUDBase
+from hmm.core.cache import mark_written
+from hmm.crud.base import CRUDBase, relationship_tables
+from hmm.core.utils.sql import in_array
+from hmm.crud.tasks.group import get_group_crud
 from hmm.models.tasks.group import TaskGroup
 from hmm.models.tasks.subtask_tasks import TypicalSubTask
 from hmm.schemas.expedition import (
     ExpeditionTemplateCreate,
+    ExpeditionTemplateFrontFullCreate,
     ExpeditionTemplateFrontRead,
     Heroes2ExpeditionRead,
-    Task2ExpeditionRead,
 )
 
 if TYPE_CHECKING:
@@ -53,17 +57,26 @@ class ExpeditionTemplateCrud(
 
     async def insert_tasks(
         self, session: AsyncSession, tasks: list[uuid.UUID], to_: uuid.UUID
-    ):
-        t2g = []
-        for ti in tasks:
-            t2g.append(
-                Task2ExpeditionRead(
-                    group_id=ti, expedition_id=to_
-                ).model_dump()
-            )
-
-        ins_stmt = insert(get_Task2Expedition()).values(t2g)
-        await session.execute(ins_stmt)
+    ) -> list[TaskGroup]:
+        """Link the groups and return them (with `sub_task`) in one
+        round-trip: the insert is a CTE joined by the select"""
+        Task2Expedition = get_Task2Expedition()
+        t2e = [dict(group_id=ti, expedition_id=to_) for ti in tasks]
+        ins_cte = (
+            insert(Task2Expedition)
+            .values(t2e)
+            .returning(Task2Expedition.group_id)
+            .cte("t2e")
+        )
+        stmt = (
+            select(TaskGroup)
+            .join(ins_cte, ins_cte.c.group_id == TaskGroup.id)
+            .options(joinedload(TaskGroup.sub_task))
+        )
+        res = list((await session.scalars(stmt)).unique().all())
+        # a DML CTE inside a select is not seen by the write tracking
+        mark_written(session, Task2Expedition.__tablename__)
+        return res
 
     async def insert_heroes(
         self, session: AsyncSession, heroes: list[uuid.UUID], to_: uuid.UUID
@@ -80,14 +93,83 @@ class ExpeditionTemplateCrud(
         await session.execute(ins_stmt)
 
     async def extended_create(
-        self, session: AsyncSession, data: ExpeditionTemplateCreate
+        self,
+        session: AsyncSession,
+        data: ExpeditionTemplateCreate,
+        groups: list[TaskGroup] | None = None,
     ) -> ExpeditionTemplate:
+        """`groups` - already loaded groups (e.g. just created ones): they
+        are only linked, not selected again"""
         rd = data.to_db()
         res = await self.create(session, obj_in=rd)
-        await self.insert_tasks(session, data.tasks, res.id)
+        if groups is None:
+            tasks = await self.insert_tasks(session, data.tasks, res.id)
+        else:
+            t2e = [dict(group_id=gi.id, expedition_id=res.id) for gi in groups]
+            await session.execute(insert(get_Task2Expedition()), t2e)
+            tasks = groups
         # await self.insert_heroes(session, data.tasks, res.id)
+        set_committed_value(res, "tasks", tasks)
+        set_committed_value(res, "heroes", [])
         return res
 
+    async def extended_create_many(
+        self,
+        session: AsyncSession,
+        data: list[ExpeditionTemplateFrontFullCreate],
+        author_id: int,
+    ) -> list[ExpeditionTemplate]:
+        """Many expeditions with their groups: every table gets one
+        executemany whatever the number of expeditions and groups"""
+        if not data:
+            return []
+        groups = await get_group_crud().extended_create_many(
+            session,
+            [gi for di in data for gi in di.tasks],
+            with_sub_tasks=False,
+        )
+        groups_iter = iter(groups)
+        tasks_ids = [[next(groups_iter).id for _ in di.tasks] for di in data]
+        expeditions = await self._insert_returning(
+            session,
+            [
+                di.to_db(author_id, ti).to_db()
+                for di, ti in zip(data, tasks_ids)
+            ],
+        )
+        t2e = [
+            dict(group_id=gi, expedition_id=ei.id)
+            for ei, ti in zip(expeditions, tasks_ids)
+            for gi in ti
+        ]
+        await session.execute(insert(get_Task2Expedition()), t2e)
+        return list(expeditions)
+
+    async def insert_heroes_many(
+        self, session: AsyncSession, picks: dict[uuid.UUID, list[uuid.UUID]]
+    ):
+        h2e = [
+            dict(hero_id=hi, expedition_id=ei)
+            for ei, heroes in picks.items()
+            for hi in heroes
+        ]
+        if h2e:
+            await session.execute(insert(get_Heroes2Expedition()), h2e)
+
+    async def get_many_with_subtasks(
+        self, session: AsyncSession, ids: list[uuid.UUID]
+    ) -> list[ExpeditionTemplate]:
+        stmt = (
+            select(ExpeditionTemplate)
+            .options(
+                selectinload(ExpeditionTemplate.tasks).selectinload(
+                    TaskGroup.sub_task
+                )
+            )
+            .where(in_array(ExpeditionTemplate.id, ids))
+        )
+        return list((await session.scalars(stmt)).all())
+
     async def set_status(
         self, session: AsyncSession, to_: uuid.UUID, status: ExpeditionStatus
     ):
@@ -121,6 +203,15 @@ class ExtendedExpeditionTemplateCrud(ExpeditionTemplateCrud):
             joinedload(self.model.author),
         )
 
+    @property
+    def version_tables(self) -> tuple[str, ...]:
+        return relationship_tables(
+            self.model.tasks,
+            TaskGroup.sub_task,
+            self.model.heroes,
+            self.model.author,
+        )
+
 
 @cache
 def get_extended_expedition_template_crud():
@@ -1,12 +1,33 @@
+import uuid
 from functools import cache
 
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from hmm.models.hero import Hero
 from hmm.crud.base import CRUDBase
-from hmm.schemas.hero import HeroCreate, HeroFrontRead
+from hmm.core.utils.sql import not_in_array
+from hmm.schemas.hero import HeroCandidate, HeroCreate, HeroFrontRead
 
 
 class HeroCrud(CRUDBase[Hero, HeroFrontRead, HeroCreate]):
-    pass
+
+    def candidates_stmt(
+        self, exclude_ids: list[uuid.UUID] | None = None
+    ) -> Select:
+        """Light hero rows for the autopick (index-only scan, see
+        `hmm.core.explain`)"""
+        stmt = select(Hero.id, Hero.hero_class, Hero.hero_lvl, Hero.mana)
+        if exclude_ids:
+            stmt = stmt.where(not_in_array(Hero.id, exclude_ids))
+        return stmt.order_by(Hero.hero_class, Hero.mana)
+
+    async def get_candidates(
+        self, session: AsyncSession, exclude_ids: list[uuid.UUID] | None = None
+    ) -> list[HeroCandidate]:
+        stmt = self.candidates_stmt(exclude_ids)
+        rows = (await session.execute(stmt)).all()
+        return [HeroCandidate.model_validate(ri) for ri in rows]
 
 
 @cache
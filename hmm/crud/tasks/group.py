@@ -2,17 +2,21 @@ from functools import cache
 from typing import TYPE_CHECKING
 
 from hmm.models.tasks.group import TaskGroup
-from hmm.crud.base import CRUDBase
+from hmm.core.cache import mark_written
+from hmm.crud.base import CRUDBase, relationship_tables
+from hmm.core.utils.sql import in_array
+from hmm.crud.tasks.subtask_tasks import get_sub_task_ids
 from hmm.schemas.tasks.group import (
     TaskGroupCreate,
     TaskGroupFrontCreate,
     TaskGroupFrontRead,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import insert
+from sqlalchemy import insert, select
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from hmm.schemas.tasks.task_groups import Task2GroupCreate
+from hmm.models.tasks.subtask_tasks import TypicalSubTask
 
 if TYPE_CHECKING:
     from hmm.models.tasks.task_group import Task2Group
@@ -30,23 +34,64 @@ class TaskGroupCrud(CRUDBase[TaskGroup, TaskGroupFrontRead, TaskGroupCreate]):
     async def extended_create(
         self, session: AsyncSession, data: TaskGroupFrontCreate
     ) -> TaskGroup:
+        """Group with its `sub_task` already loaded: the links are inserted
+        in a CTE and the sub-tasks are selected in the same statement"""
+        await get_sub_task_ids().check(session, data.sub_task)
         res = await self.create(session, obj_in=data.to_db())
-        t2g = []
-        for ti in data.sub_task:
-            t2g.append(
-                Task2GroupCreate(group_id=res.id, typical_task=ti).model_dump()
-            )
-        ins_stmt = insert(get_Task2Group()).values(t2g)
-        await session.execute(ins_stmt)
+        Task2Group = get_Task2Group()
+        t2g = [dict(group_id=res.id, typical_task=ti) for ti in data.sub_task]
+        ins_cte = (
+            insert(Task2Group)
+            .values(t2g)
+            .returning(Task2Group.typical_task)
+            .cte("t2g")
+        )
+        stmt = select(TypicalSubTask).join(
+            ins_cte, ins_cte.c.typical_task == TypicalSubTask.id
+        )
+        sub_tasks = (await session.scalars(stmt)).all()
+        # a DML CTE inside a select is not seen by the write tracking
+        mark_written(session, Task2Group.__tablename__)
+        set_committed_value(res, "sub_task", list(sub_tasks))
         return res
 
     async def extended_create_many(
-        self, session: AsyncSession, data: list[TaskGroupFrontCreate]
+        self,
+        session: AsyncSession,
+        data: list[TaskGroupFrontCreate],
+        with_sub_tasks: bool = True,
     ) -> list[TaskGroup]:
-        ret: list[TaskGroup] = []
-        for di in data:
-            ret.append(await self.extended_create(session, di))
-        return ret
+        """Groups, their links and the sub-tasks for the response in three
+        statements whatever the number of groups (SQLAlchemy batches the
+        executemany into multi-row `VALUES`)"""
+        if not data:
+            return []
+        await get_sub_task_ids().check(
+            session, {ti for di in data for ti in di.sub_task}
+        )
+        groups = await self._insert_returning(
+            session, [di.to_db().model_dump() for di in data]
+        )
+        t2g = [
+            dict(group_id=gi.id, typical_task=ti)
+            for gi, di in zip(groups, data)
+            for ti in di.sub_task
+        ]
+        await session.execute(insert(get_Task2Group()), t2g)
+        if not with_sub_tasks:
+            return list(groups)
+        sub_task_ids = {ri["typical_task"] for ri in t2g}
+        stmt = select(TypicalSubTask).where(
+            in_array(TypicalSubTask.id, sub_task_ids)
+        )
+        sub_tasks = {si.id: si for si in (await session.scalars(stmt)).all()}
+        for gi, di in zip(groups, data):
+            set_committed_value(
+                gi,
+                "sub_task",
+                [sub_tasks[ti] for ti in di.sub_task if ti in sub_tasks],
+            )
+        return list(groups)
 
 
 class ExtendedTaskGroupCrud(
@@ -59,6 +104,10 @@ class ExtendedTaskGroupCrud(
             selectinload(self._model.sub_task)
         )
 
+    @property
+    def version_tables(self) -> tuple[str, ...]:
+        return relationship_tables(self._model.sub_task)
+
 
 @cache
 def get_extended_group_crud():
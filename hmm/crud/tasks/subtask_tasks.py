@@ -1,6 +1,13 @@
+from collections.abc import Iterable
 from functools import cache
+import uuid
+
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from hmm.config import get_settings
+from hmm.core.cache import register_invalidator, written_tables
+from hmm.core.exceptions import UnknownSubTaskError
 from hmm.models.tasks.subtask_tasks import TypicalSubTask
 from hmm.crud.base import CRUDBase
 from hmm.schemas.tasks.subtask_tasks import (
@@ -12,14 +19,65 @@ from hmm.schemas.tasks.subtask_tasks import (
 class TypicalSubTaskCrud(
     CRUDBase[TypicalSubTask, TypicalSubTaskFrontRead, TypicalSubTaskCreate]
 ):
-    async def bulk_create(
-        self, session: AsyncSession, data: list[TypicalSubTaskCreate]
-    ):
-        db_objs = [self.model(**di.to_db()) for di in data]
-        session.add_all(db_objs)
-        await session.flush(db_objs)
+    natural_key = ("name", "task_type", "task_lvl")
+
+
+class SubTaskIds:
+    """In-memory set of the catalog ids.
+
+    Loaded lazily (or at startup) and dropped on any committed write to the
+    catalog, so references to sub-tasks are checked without a query. Writes
+    of other workers may not have dropped it yet: an id missing from the
+    set is looked up again before it is rejected.
+    """
+
+    def __init__(self) -> None:
+        self._ids: frozenset[uuid.UUID] | None = None
+        self._writes = 0
+
+    def invalidate(self, tables: set[str]) -> None:
+        if TypicalSubTask.__tablename__ in tables:
+            self._ids = None
+            self._writes += 1
+
+    async def load(self, session: AsyncSession) -> frozenset[uuid.UUID]:
+        writes = self._writes
+        ids = frozenset(await session.scalars(select(TypicalSubTask.id)))
+        # keep the set only if no catalog write was committed meanwhile and
+        # it holds no rows of the session's own (uncommitted) writes
+        if (
+            writes == self._writes
+            and get_settings().cache.enabled
+            and TypicalSubTask.__tablename__ not in written_tables(session)
+        ):
+            self._ids = ids
+        return ids
+
+    async def get(self, session: AsyncSession) -> frozenset[uuid.UUID]:
+        if self._ids is not None:
+            return self._ids
+        return await self.load(session)
+
+    async def check(
+        self, session: AsyncSession, ids: Iterable[uuid.UUID]
+    ) -> None:
+        cached = self._ids
+        missing = set(ids) - await self.get(session)
+        if missing and cached is not None:
+            missing -= await self.load(session)
+        if missing:
+            raise UnknownSubTaskError(
+                details=dict(sub_task=sorted(str(mi) for mi in missing))
+            )
 
 
 @cache
 def get_typical_task_crud():
     return TypicalSubTaskCrud()
+
+
+@cache
+def get_sub_task_ids() -> SubTaskIds:
+    ids = SubTaskIds()
+    register_invalidator(ids.invalidate)
+    return ids
@@ -70,6 +70,46 @@ class HeroUsedTimeTableCrud(
         )
         return (await session.execute(stmt)).scalars().all()
 
+    @staticmethod
+    def is_banned(
+        t_start: datetime.datetime,
+        t_end: datetime.datetime,
+        date_start: datetime.datetime,
+        date_end: datetime.datetime,
+    ) -> bool:
+        """In-memory twin of the `get_banned_heroes` condition"""
+        return (
+            (t_start <= date_start and t_end >= date_start)
+            or (t_end <= date_end and t_start >= date_end)
+            or (t_start >= date_start and t_end <= date_end)
+        )
+
+    async def get_intervals(
+        self,
+        session: AsyncSession,
+        date_start: datetime.datetime,
+        date_end: datetime.datetime,
+    ) -> list[tuple[uuid.UUID, datetime.datetime, datetime.datetime]]:
+        """Every booking that can ban a hero for an expedition inside
+        [date_start, date_end]"""
+        stmt = select(
+            HeroUsedTimeTable.hero_id,
+            HeroUsedTimeTable.date_start,
+            HeroUsedTimeTable.date_end,
+        ).where(
+            HeroUsedTimeTable.date_end >= date_start,
+            HeroUsedTimeTable.date_start <= date_end,
+        )
+        return [tuple(ri) for ri in (await session.execute(stmt)).all()]
+
+    async def set_timetables_many(
+        self, session: AsyncSession, data: list[HeroUsedTimeTableCreate]
+    ):
+        if data:
+            await session.execute(
+                insert(HeroUsedTimeTable), [di.model_dump() for di in data]
+            )
+
     async def set_timetables(
         self,
         session: AsyncSession,
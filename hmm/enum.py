@@ -1,4 +1,4 @@
-from enum import IntEnum
+from enum import Enum, IntEnum
 
 from hmm.core.utils.common import EnumDescriptionMixin
 
@@ -18,3 +18,8 @@ class ExpeditionStatus(EnumDescriptionMixin, IntEnum):
     created = 1
     error = 2
     finished = 3
+
+
+class ImportMode(EnumDescriptionMixin, str, Enum):
+    append = "append"
+    sync = "sync"
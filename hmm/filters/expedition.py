@@ -1,10 +1,15 @@
+import uuid
 from datetime import datetime
 
+from pydantic import Field
+from sqlalchemy import Select, func
+
 from hmm.core.filtering.sqlalchemy import Filter
-from hmm.models.expedition import ExpeditionTemplate
+from hmm.models.expedition import SEARCH_CONFIG, ExpeditionTemplate
 
 
 class ExpeditionTemplateFilter(Filter):
+    id__in: list[uuid.UUID] | None = None
     created_at__from: datetime | None = None
     created_at__till: datetime | None = None
 
@@ -17,12 +22,40 @@ class ExpeditionTemplateFilter(Filter):
     date_end__from: datetime | None = None
     date_end__till: datetime | None = None
 
+    search: str | None = Field(
+        None,
+        description=(
+            "Полнотекстовый поиск по названию и описанию (синтаксис"
+            ' websearch: `"фраза"`, `or`, `-слово`), результат'
+            " отсортирован по релевантности"
+        ),
+    )
+
     class Constants(Filter.Constants):
         model = ExpeditionTemplate
         search_model_fields = [
+            "id",
             "created_at",
             "name",
             "description",
             "date_start",
             "date_end",
         ]
+
+    @property
+    def _search_query(self):
+        return func.websearch_to_tsquery(SEARCH_CONFIG, self.search)
+
+    def criteria_search(self, value: str):
+        return ExpeditionTemplate.search_vector.op("@@")(self._search_query)
+
+    def filter(self, stmt: Select) -> Select:
+        stmt = super().filter(stmt)
+        if self.search:
+            # rank first, the requested ordering breaks ties
+            stmt = stmt.order_by(
+                func.ts_rank(
+                    ExpeditionTemplate.search_vector, self._search_query
+                ).desc()
+            )
+        return stmt
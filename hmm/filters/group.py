@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime
 
 from hmm.core.filtering.sqlalchemy import Filter
@@ -5,6 +6,7 @@ from hmm.models.tasks.group import TaskGroup
 
 
 class TaskGroupFilter(Filter):
+    id__in: list[uuid.UUID] | None = None
     created_at__from: datetime | None = None
     created_at__till: datetime | None = None
 
@@ -12,4 +14,4 @@ class TaskGroupFilter(Filter):
 
     class Constants(Filter.Constants):
         model = TaskGroup
-        search_model_fields = ["created_at", "name"]
+        search_model_fields = ["id", "created_at", "name"]
@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime
 
 from hmm.core.filtering.sqlalchemy import Filter
@@ -6,10 +7,12 @@ from hmm.models.hero import Hero
 
 
 class HeroFilter(Filter):
+    id__in: list[uuid.UUID] | None = None
     created_at__from: datetime | None = None
     created_at__till: datetime | None = None
 
     name__ilike: str | None = None
+    name__similar: str | None = None
     hero_class: HeroCategory | None = None
     hero_lvl: int | None = None
     mana__gte: float | None = None
@@ -18,6 +21,7 @@ class HeroFilter(Filter):
     class Constants(Filter.Constants):
         model = Hero
         search_model_fields = [
+            "id",
             "created_at",
             "name",
             "hero_lvl",
@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime
 
 from hmm.core.filtering.sqlalchemy import Filter
@@ -6,10 +7,12 @@ from hmm.models.tasks.subtask_tasks import TypicalSubTask
 
 
 class TypicalSubTaskFilter(Filter):
+    id__in: list[uuid.UUID] | None = None
     created_at__from: datetime | None = None
     created_at__till: datetime | None = None
 
     name__ilike: str | None = None
+    name__similar: str | None = None
     task_type: SubTaskType | None = None
     task_lvl: int | None = None
     w_mana__gte: float | None = None
@@ -23,6 +26,7 @@ class TypicalSubTaskFilter(Filter):
     class Constants(Filter.Constants):
         model = TypicalSubTask
         search_model_fields = [
+            "id",
             "created_at",
             "w_mana",
             "m_mana",
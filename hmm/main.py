@@ -1,17 +1,45 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from loguru import logger
 
+from hmm.core.auth.revocation import get_revocation_list
+from hmm.core.bus import listen
+from hmm.core.crypto import get_password_pool
+from hmm.core.db import AsyncSessionMaker
 from hmm.core.middleware import default_catch_exception
+from hmm.crud.tasks.subtask_tasks import get_sub_task_ids
 from hmm.router import router
 from hmm.config import get_settings
 from hmm.core.swagger.swagger import add_custom_swagger, init_swagger_routes
 
 
+async def preload_catalog():
+    try:
+        async with AsyncSessionMaker() as session:
+            ids = await get_sub_task_ids().load(session)
+        logger.info("[Server] Sub-task catalog loaded: {} ids", len(ids))
+    except Exception as e:
+        logger.warning("[Server] Sub-task catalog preload failed: {}", e)
+
+
 @asynccontextmanager
 async def lifespan(_: FastAPI):
+    revocation = None
+    if get_settings().auth.stateless_tokens:
+        revocation = asyncio.create_task(get_revocation_list().run())
+    bus = None
+    if get_settings().cache.bus_enabled:
+        bus = asyncio.create_task(listen())
+    await preload_catalog()
     logger.info("[Server] Inited")
     yield
+    if revocation is not None:
+        revocation.cancel()
+    if bus is not None:
+        bus.cancel()
+    if get_password_pool.cache_info().currsize:
+        get_password_pool().shutdown(cancel_futures=True)
     logger.info("[Server] Stopped")
 
 
@@ -3,3 +3,4 @@ from .hero import *  # noqa
 from .tasks import *  # noqa
 from .expedition import *  # noqa
 from .timetable import *  # noqa
+from .table_version import *  # noqa
@@ -1,7 +1,22 @@
 import datetime
-from sqlalchemy import Boolean, DateTime, String, Text, false, func, true
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Integer,
+    String,
+    Text,
+    false,
+    func,
+    text,
+    true,
+)
 from sqlalchemy.orm import Mapped, mapped_column
-from hmm.models.base import Base, BigIdCreatedDateBaseMixin, BoundDbModel
+from hmm.models.base import (
+    Base,
+    BigIdCreatedDateBaseMixin,
+    BoundDbModel,
+    trgm_index,
+)
 from hmm.schemas.auth import UserNameStr
 
 
@@ -16,6 +31,10 @@ class User(BoundDbModel, BigIdCreatedDateBaseMixin, Base):
     )
     is_super: Mapped[bool] = mapped_column(Boolean(), server_default=false())
     is_active: Mapped[bool] = mapped_column(Boolean(), server_default=true())
+    # bumped on every change, invalidates stateless tokens issued before
+    version: Mapped[int] = mapped_column(Integer(), server_default=text("0"))
+
+    __table_args__ = (trgm_index("hmm_user", "username"),)
 
     @classmethod
     def bound_date_column(cls):
@@ -11,6 +11,7 @@ from sqlalchemy import (
     Column,
     DateTime,
     func,
+    Index,
     Integer,
     TypeDecorator,
     Select,
@@ -23,6 +24,17 @@ from hmm.core.utils.common import FilterType, camel_to_snake
 
 class_registry: dict = {}
 
+
+def trgm_index(table_name: str, column: str) -> Index:
+    """pg_trgm GIN index: serves `LIKE` / `ILIKE '%...%'` and `%`"""
+    return Index(
+        f"ix_{table_name}_{column}_trgm",
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    )
+
+
 MIN_DATE_SQL_LABEL = "x_min_date"
 MAX_DATE_SQL_LABEL = "x_max_date"
 
@@ -3,6 +3,8 @@ from functools import cache
 from typing import TYPE_CHECKING
 import uuid
 from sqlalchemy import (
+    Computed,
+    Index,
     String,
     Text,
     ForeignKey,
@@ -11,6 +13,7 @@ from sqlalchemy import (
     SmallInteger,
     Float,
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from hmm.enum import ExpeditionStatus
 from hmm.models.base import (
@@ -18,6 +21,7 @@ from hmm.models.base import (
     UUIDDateCreatedMixin,
     DateCreatedMixin,
     BoundDbModel,
+    trgm_index,
 )
 from hmm.models.tasks.group import TaskGroup
 
@@ -40,6 +44,14 @@ def get_User() -> type["User"]:
     return User
 
 
+SEARCH_CONFIG = "russian"
+SEARCH_VECTOR_EXPRESSION = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A')"
+    f" || setweight(to_tsvector('{SEARCH_CONFIG}',"
+    " coalesce(description, '')), 'B')"
+)
+
+
 class ExpeditionTemplate(BoundDbModel, UUIDDateCreatedMixin, Base):
     name: Mapped[str] = mapped_column(String(256))
     description: Mapped[str] = mapped_column(Text())
@@ -79,6 +91,23 @@ class ExpeditionTemplate(BoundDbModel, UUIDDateCreatedMixin, Base):
     heroes: Mapped[list["Hero"]] = ...
     author: Mapped["User"] = relationship(get_User())
 
+    # weighted name (A) + description (B) for `search=`
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR(),
+        Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+        deferred=True,
+    )
+
+    __table_args__ = (
+        trgm_index("hmm_expedition_template", "name"),
+        trgm_index("hmm_expedition_template", "description"),
+        Index(
+            "ix_hmm_expedition_template_search_vector",
+            "search_vector",
+            postgresql_using="gin",
+        ),
+    )
+
     @classmethod
     def bound_date_column(cls):
         return cls.created_at
@@ -1,18 +1,34 @@
-from sqlalchemy import String, SmallInteger, Float
+from sqlalchemy import Index, String, SmallInteger, Float
 from sqlalchemy.orm import Mapped, mapped_column
 from hmm.enum import HeroCategory
-from hmm.models.base import Base, UUIDDateCreatedMixin, BoundDbModel
+from hmm.models.base import (
+    Base,
+    UUIDDateCreatedMixin,
+    BoundDbModel,
+    trgm_index,
+)
 
 
 class Hero(BoundDbModel, UUIDDateCreatedMixin, Base):
     name: Mapped[str] = mapped_column(String(256))
-    hero_class: Mapped[HeroCategory] = mapped_column(
-        SmallInteger(), index=True
-    )
+    hero_class: Mapped[HeroCategory] = mapped_column(SmallInteger())
     hero_lvl: Mapped[int] = mapped_column(SmallInteger(), index=True)
 
     mana: Mapped[float] = mapped_column(Float(precision=2))
 
+    __table_args__ = (
+        trgm_index("hmm_hero", "name"),
+        # autopick candidates: class partition ordered by mana, index-only
+        Index(
+            "ix_hmm_hero_class_mana",
+            "hero_class",
+            "mana",
+            postgresql_include=["hero_lvl", "id"],
+        ),
+        # HeroFilter: class + level + mana range
+        Index("ix_hmm_hero_class_lvl_mana", "hero_class", "hero_lvl", "mana"),
+    )
+
     @classmethod
     def bound_date_column(cls):
         return cls.created_at
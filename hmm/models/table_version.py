@@ -0,0 +1,13 @@
+from sqlalchemy import BigInteger, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+from hmm.models.base import Base
+
+
+class TableVersion(Base):
+    """Change counter per table, bumped at commit by every transaction that
+    wrote to the table (see the `table version` migration)"""
+
+    table_name: Mapped[str] = mapped_column(String(63), primary_key=True)
+    version: Mapped[int] = mapped_column(
+        BigInteger(), server_default=text("0")
+    )
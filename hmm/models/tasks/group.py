@@ -2,7 +2,12 @@ from functools import cache
 from typing import TYPE_CHECKING
 from sqlalchemy import String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from hmm.models.base import Base, UUIDDateCreatedMixin, BoundDbModel
+from hmm.models.base import (
+    Base,
+    UUIDDateCreatedMixin,
+    BoundDbModel,
+    trgm_index,
+)
 
 if TYPE_CHECKING:
     from hmm.models.tasks.subtask_tasks import TypicalSubTask
@@ -21,6 +26,8 @@ class TaskGroup(BoundDbModel, UUIDDateCreatedMixin, Base):
 
     sub_task: Mapped[list["TypicalSubTask"]] = ...
 
+    __table_args__ = (trgm_index("hmm_task_group", "name"),)
+
     @classmethod
     def bound_date_column(cls):
         return cls.created_at
@@ -1,8 +1,13 @@
 from functools import cached_property
-from sqlalchemy import String, SmallInteger, Float
+from sqlalchemy import Index, String, SmallInteger, Float
 from sqlalchemy.orm import Mapped, mapped_column
 from hmm.enum import SubTaskType
-from hmm.models.base import Base, UUIDDateCreatedMixin, BoundDbModel
+from hmm.models.base import (
+    Base,
+    UUIDDateCreatedMixin,
+    BoundDbModel,
+    trgm_index,
+)
 
 
 class TypicalSubTask(BoundDbModel, UUIDDateCreatedMixin, Base):
@@ -15,6 +20,16 @@ class TypicalSubTask(BoundDbModel, UUIDDateCreatedMixin, Base):
     m_mana: Mapped[float] = mapped_column(Float(precision=2))
     s_mana: Mapped[float] = mapped_column(Float(precision=2))
 
+    __table_args__ = (
+        Index(
+            "ix_hmm_typical_sub_task_natural_key",
+            "name",
+            "task_type",
+            "task_lvl",
+        ),
+        trgm_index("hmm_typical_sub_task", "name"),
+    )
+
     @cached_property
     def total_mana(self) -> float:
         return self.w_mana + self.m_mana + self.s_mana
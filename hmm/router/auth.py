@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -90,6 +90,7 @@ async def post_registration(
 @sup_sec_router.get("")
 async def get_users(
     response: Response,
+    request: Request,
     session: AsyncSession = Depends(get_session),
     crud: UserCrud = Depends(get_user_crud),
     pagination: Paginator = Depends(default_paginator),
@@ -107,6 +108,7 @@ async def get_users(
         UserFront,
         execute_scalars=True,
         add_bound_date_header=True,
+        request=request,
     )
 
 
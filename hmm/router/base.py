@@ -1,14 +1,27 @@
 import asyncio
 import datetime
-from typing import Any, Callable, Sequence, TypeVar
-from fastapi import Response
+import hashlib
+from functools import cache
+from typing import Any, Callable, Hashable, Iterable, Sequence, TypeVar
+from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import Select
+from sqlalchemy import Result, Select, select
+from sqlalchemy.dialects.postgresql.asyncpg import PGDialect_asyncpg
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from hmm.config import get_settings
+from hmm.core.cache import (
+    SingleFlight,
+    TTLCache,
+    register_cache,
+    statement_tables,
+)
+from hmm.core.db import AsyncSessionMaker
 from hmm.crud.base import CRUDBase
+from hmm.core.utils.sql import in_array
 from hmm.models.base import Base, BoundDbModel
+from hmm.models.table_version import TableVersion
 from hmm.schemas.base import OrmModel
 from hmm.core.filtering.base import BaseFilterModel
 from hmm.core.ordering import Ordering
@@ -44,6 +57,63 @@ class BaseHeaderDate(OrmModel):
         return self.model_dump(mode="json", by_alias=True, exclude_none=True)
 
 
+_dialect = PGDialect_asyncpg()
+
+
+@cache
+def get_headers_cache() -> TTLCache:
+    settings = get_settings().cache
+    return register_cache(
+        TTLCache(
+            settings.headers_maxsize,
+            settings.headers_ttl,
+            settings.headers_stale_ttl,
+            name="headers",
+        )
+    )
+
+
+def _statement_key(stmt: Select) -> tuple[str, str]:
+    compiled = stmt.compile(dialect=_dialect)
+    return compiled.string, repr(sorted(compiled.params.items()))
+
+
+async def _fetch(
+    session: AsyncSession, stmt: Select, fetch: Callable[[Result], Any]
+) -> Any:
+    return fetch(await session.execute(stmt))
+
+
+async def _fetch_detached(stmt: Select, fetch: Callable[[Result], Any]) -> Any:
+    async with AsyncSessionMaker() as session:
+        return await _fetch(session, stmt, fetch)
+
+
+async def cached_fetch(
+    session: AsyncSession, stmt: Select, fetch: Callable[[Result], Any]
+) -> Any:
+    """Run a header metadata query (total count, date bounds) through the
+    headers cache. The entry is keyed by the compiled statement and dropped
+    on a commit touching any of its tables; stale entries are served while
+    being refreshed in the background with a separate session."""
+    if not get_settings().cache.enabled:
+        return await _fetch(session, stmt, fetch)
+    return await get_headers_cache().get_or_load(
+        _statement_key(stmt),
+        lambda: _fetch(session, stmt, fetch),
+        lambda: _fetch_detached(stmt, fetch),
+        tags=statement_tables(stmt),
+    )
+
+
+def _fetch_count(result: Result) -> int:
+    return result.scalar()
+
+
+def _fetch_bounds(result: Result) -> dict[str, str]:
+    return BaseHeaderDate.model_validate(result.first()).headers
+
+
 async def set_bounds_response(
     session: AsyncSession,
     response: Response,
@@ -51,8 +121,7 @@ async def set_bounds_response(
     **kwargs,
 ) -> None:
     query = model.date_bounds(**kwargs)
-    boarders = (await session.execute(query)).first()
-    headers = BaseHeaderDate.model_validate(boarders).headers
+    headers = await cached_fetch(session, query, _fetch_bounds)
     response.headers.update(headers)
 
 
@@ -74,7 +143,17 @@ async def execute_mode(session: AsyncSession, stmt: Select, mode: bool):
     return data
 
 
-async def base_model_get(
+def _filter_query(
+    query: Select, query_filter: BaseFilterModel | None, patch_query=None
+) -> Select:
+    if patch_query:
+        query = patch_query(query)
+    if query_filter:
+        query = query_filter.filter(query)
+    return query
+
+
+async def _base_model_get(
     response: Response,
     session: AsyncSession,
     crud: CRUDBase,
@@ -93,16 +172,13 @@ async def base_model_get(
     _bound_response_kwargs: dict[str, Any] | None = None,
     execute_scalars: bool = True,
 ):
-    if patch_query:
-        query = patch_query(query)
-    if query_filter:
-        query = query_filter.filter(query)
+    query = _filter_query(query, query_filter, patch_query)
     if ordering:
         query = ordering.sort(query)
     qs, c = pagination.paginate(query)
     data = await execute_mode(session, qs, execute_scalars)
     if add_total_count_header:
-        size = (await session.execute(c)).scalar()
+        size = await cached_fetch(session, c, _fetch_count)
         response.headers.update({TOTAL_COUNT: str(size)})
     if add_bound_date_header:
         if crud is None:
@@ -122,3 +198,162 @@ async def base_model_get(
             headers=response.headers,
         )
     return data
+
+
+_list_flight = SingleFlight("list")
+
+
+def _coalesce_key(request: Request, scope: Hashable) -> Hashable:
+    return (
+        request.method,
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        scope,
+    )
+
+
+async def table_versions(
+    session: AsyncSession, tables: Iterable[str]
+) -> dict[str, int]:
+    """Change counters maintained by the `hmm_table_version` triggers"""
+    stmt = select(TableVersion.table_name, TableVersion.version).where(
+        in_array(TableVersion.table_name, tables)
+    )
+    return dict((await session.execute(stmt)).tuples().all())
+
+
+def _make_etag(key: Hashable, versions: dict[str, int]) -> str:
+    digest = hashlib.blake2b(
+        repr((key, sorted(versions.items()))).encode(), digest_size=16
+    )
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in {
+        ti.strip() for ti in header.split(",")
+    }
+
+
+async def _shared_model_get(
+    session: AsyncSession, **kwargs
+) -> tuple[bytes, dict[str, str]]:
+    # a fresh response: the result may be served to other requests, so it
+    # must not carry the headers set for this one
+    response = Response()
+    del response.headers["content-length"]
+    res = await _base_model_get(response, session, **kwargs)
+    return res.body, {
+        ki: vi for ki, vi in res.headers.items() if ki != "content-length"
+    }
+
+
+def _merge_headers(res: Response, response: Response) -> Response:
+    """Carry the headers set on the injected `response` (by the endpoint or
+    its dependencies) over to the `res` returned instead of it"""
+    for ki, vi in response.headers.items():
+        if ki == "content-length":
+            continue
+        if ki == "set-cookie" or ki not in res.headers:
+            res.headers.append(ki, vi)
+    return res
+
+
+async def base_model_get(
+    response: Response,
+    session: AsyncSession,
+    crud: CRUDBase,
+    pagination: Paginator,
+    query_filter: BaseFilterModel | None,
+    ordering: Ordering | None,
+    query: Select,
+    response_schema: type[BaseModelT] | None = None,
+    add_total_count_header: bool = True,
+    add_bound_date_header: bool = False,
+    obj_to_response: (
+        Callable[[Sequence[Base], type[BaseModelT], Response, Any], BaseModelT]
+        | None
+    ) = _obj_to_response,  # type: ignore
+    patch_query=None,
+    _bound_response_kwargs: dict[str, Any] | None = None,
+    execute_scalars: bool = True,
+    request: Request | None = None,
+    coalesce_scope: Hashable = None,
+    etag: bool = False,
+    page_cache: TTLCache | None = None,
+):
+    """List endpoint body: filter, order, paginate and serialize `query`.
+
+    With `request` given, concurrent requests with the same path, query
+    string and `coalesce_scope` share a single computation and its
+    serialized body; it runs on the session of the first of them.
+    `coalesce_scope` must tell apart callers that may see different rows for
+    the same url (e.g. a per-user queryset).
+
+    With `etag` the response carries a weak `ETag` built from the url and
+    the change counters of every table the query reads; a matching
+    `If-None-Match` is answered with `304` before the page is queried.
+
+    `page_cache` keeps the serialized responses by url; entries are dropped
+    when a write to any of the tables read is committed.
+    """
+    kwargs = dict(
+        crud=crud,
+        pagination=pagination,
+        query_filter=query_filter,
+        ordering=ordering,
+        query=query,
+        response_schema=response_schema,
+        add_total_count_header=add_total_count_header,
+        add_bound_date_header=add_bound_date_header,
+        obj_to_response=obj_to_response,
+        patch_query=patch_query,
+        _bound_response_kwargs=_bound_response_kwargs,
+        execute_scalars=execute_scalars,
+    )
+    serialized = obj_to_response and response_schema is not None
+    if request is None or not serialized:
+        return await _base_model_get(response, session, **kwargs)
+    key = _coalesce_key(request, coalesce_scope)
+    tables: set[str] = set()
+    if etag or page_cache is not None:
+        tables = statement_tables(
+            _filter_query(query, query_filter, patch_query)
+        )
+        if crud is not None:
+            tables.update(crud.version_tables)
+    tag = None
+    if etag:
+        tag = _make_etag(key, await table_versions(session, tables))
+        if _etag_matches(request, tag):
+            return _merge_headers(
+                Response(status_code=304, headers={"etag": tag}), response
+            )
+    if page_cache is not None or get_settings().cache.coalesce_requests:
+
+        async def _compute():
+            return await _list_flight.do_inline(
+                key, lambda: _shared_model_get(session, **kwargs)
+            )
+
+        if page_cache is not None:
+            body, headers = await page_cache.get_or_load(
+                key, _compute, tags=tables
+            )
+        else:
+            body, headers = await _compute()
+        res = _merge_headers(
+            Response(
+                body, media_type=JSONResponse.media_type, headers=headers
+            ),
+            response,
+        )
+    else:
+        res = await _base_model_get(response, session, **kwargs)
+    if tag is not None:
+        res.headers["etag"] = tag
+        res.headers["cache-control"] = "no-cache"
+    return res
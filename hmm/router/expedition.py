@@ -1,4 +1,6 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, Response
+import uuid
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from hmm.core.auth.auth import authenticate_user
@@ -40,6 +42,7 @@ def get_router() -> APIRouter:
 @router.get("/expedition")
 async def get_expedition_templates(
     response: Response,
+    request: Request,
     session: AsyncSession = Depends(get_session),
     crud: ExtendedExpeditionTemplateCrud = Depends(
         get_extended_expedition_template_crud
@@ -59,6 +62,7 @@ async def get_expedition_templates(
         ordering,
         crud._select_model,
         ExpeditionTemplateFrontRead,
+        request=request,
     )
     return res
 
@@ -69,16 +73,14 @@ async def post_expedition(
     data: ExpeditionTemplateFrontCreate,
     crud: ExpeditionTemplateCrud = Depends(get_expedition_template_crud),
     session: AsyncSession = Depends(get_session),
-    ex_crud: ExtendedExpeditionTemplateCrud = Depends(
-        get_extended_expedition_template_crud
-    ),
     user: UserSession = Depends(authenticate_user),
 ) -> ExpeditionTemplateFrontRead:
     res = await crud.extended_create(session, data.to_db(user.id))
     await session.commit()
     background_tasks.add_task(get_hap_usecase().process, res.id)
-    fin = await ex_crud.get_one(session, id=res.id)
-    return fin
+    return ExpeditionTemplateFrontRead.model_validate(
+        res.as_dict() | dict(author=user)
+    )
 
 
 @router.post("/expedition-full")
@@ -87,9 +89,6 @@ async def post_expedition_full(
     data: ExpeditionTemplateFrontFullCreate,
     crud: ExpeditionTemplateCrud = Depends(get_expedition_template_crud),
     session: AsyncSession = Depends(get_session),
-    ex_crud: ExtendedExpeditionTemplateCrud = Depends(
-        get_extended_expedition_template_crud
-    ),
     user: UserSession = Depends(authenticate_user),
 ) -> ExpeditionTemplateFrontRead:
 
@@ -98,11 +97,30 @@ async def post_expedition_full(
 
     if not groups:
         raise GroupCreationErrorError()
-    await session.flush()
     task_ids = [gi.id for gi in groups]
     # expedition
-    res = await crud.extended_create(session, data.to_db(user.id, task_ids))
+    res = await crud.extended_create(
+        session, data.to_db(user.id, task_ids), groups=groups
+    )
     await session.commit()
     background_tasks.add_task(get_hap_usecase().process, res.id)
-    fin = await ex_crud.get_one(session, id=res.id)
-    return fin
+    return ExpeditionTemplateFrontRead.model_validate(
+        res.as_dict() | dict(author=user)
+    )
+
+
+@router.post("/expedition-full/bulk")
+async def post_expedition_full_bulk(
+    background_tasks: BackgroundTasks,
+    data: list[ExpeditionTemplateFrontFullCreate],
+    crud: ExpeditionTemplateCrud = Depends(get_expedition_template_crud),
+    session: AsyncSession = Depends(get_session),
+    user: UserSession = Depends(authenticate_user),
+) -> list[uuid.UUID]:
+    """Creates all the expeditions at once and staffs them in one
+    background job"""
+    expeditions = await crud.extended_create_many(session, data, user.id)
+    await session.commit()
+    ids = [ei.id for ei in expeditions]
+    background_tasks.add_task(get_hap_usecase().process_many, ids)
+    return ids
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from hmm.core.auth.auth import authenticate_user
 from hmm.core.db import get_session
@@ -10,6 +10,8 @@ from hmm.filters.hero import HeroFilter
 from hmm.models.hero import Hero
 from hmm.router.base import base_model_get
 from hmm.schemas.hero import HeroCreate, HeroFrontRead
+from hmm.schemas.imports import ImportReport
+from hmm.usecase.services.hero_extractors.file import HeroFileExtractor
 
 router = APIRouter(
     prefix="/hero", dependencies=[Depends(authenticate_user)], tags=["Hero"]
@@ -24,6 +26,7 @@ def get_router() -> APIRouter:
 @router.get("")
 async def get_hero(
     response: Response,
+    request: Request,
     session: AsyncSession = Depends(get_session),
     crud: HeroCrud = Depends(get_hero_crud),
     pagination: Paginator = Depends(paginator100),
@@ -39,6 +42,8 @@ async def get_hero(
         ordering,
         crud._select_model,
         HeroFrontRead,
+        request=request,
+        etag=True,
     )
 
 
@@ -51,3 +56,15 @@ async def post_hero(
     res = await crud.create(session, obj_in=data)
     await session.commit()
     return res
+
+
+@router.post("/bulk")
+async def post_heroes_bulk(
+    data: HeroFileExtractor = Depends(HeroFileExtractor.from_body),
+    session: AsyncSession = Depends(get_session),
+    crud: HeroCrud = Depends(get_hero_crud),
+) -> ImportReport:
+    """CSV (`name,hero_class,hero_lvl,mana`) or NDJSON, one transaction"""
+    report = await data.import_to(session, crud)
+    await session.commit()
+    return report
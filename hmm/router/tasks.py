@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, Response
+from functools import cache
+
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from hmm.config import get_settings
 from hmm.core.auth.auth import authenticate_superuser, authenticate_user
+from hmm.core.cache import TTLCache, register_cache
 from hmm.core.db import get_session
 from hmm.core.filtering.base import FilterDepends
 from hmm.core.ordering import OrderDepends, Ordering
@@ -16,11 +20,13 @@ from hmm.crud.tasks.subtask_tasks import (
     TypicalSubTaskCrud,
     get_typical_task_crud,
 )
+from hmm.enum import ImportMode
 from hmm.filters.group import TaskGroupFilter
 from hmm.filters.subtask_tasks import TypicalSubTaskFilter
 from hmm.models.tasks.group import TaskGroup
 from hmm.models.tasks.subtask_tasks import TypicalSubTask
 from hmm.router.base import base_model_get
+from hmm.schemas.imports import ImportReport
 from hmm.schemas.tasks.group import TaskGroupFrontCreate, TaskGroupFrontRead
 from hmm.schemas.tasks.subtask_tasks import (
     TypicalSubTaskCreate,
@@ -37,10 +43,22 @@ def get_router() -> APIRouter:
     return router
 
 
+@cache
+def get_catalog_cache() -> TTLCache:
+    """Serialized `GET /sub-task` pages. The catalog changes only through
+    the sub-task and grimuar imports: their commits drop the entries"""
+    settings = get_settings().cache
+    ttl = settings.catalog_ttl if settings.enabled else 0
+    return register_cache(
+        TTLCache(settings.catalog_maxsize, ttl, name="catalog")
+    )
+
+
 # sub-task
 @router.get("/sub-task")
 async def get_sub_task(
     response: Response,
+    request: Request,
     session: AsyncSession = Depends(get_session),
     crud: TypicalSubTaskCrud = Depends(get_typical_task_crud),
     pagination: Paginator = Depends(paginator100),
@@ -56,6 +74,9 @@ async def get_sub_task(
         ordering,
         crud._select_model,
         TypicalSubTaskFrontRead,
+        request=request,
+        etag=True,
+        page_cache=get_catalog_cache(),
     )
 
 
@@ -70,22 +91,25 @@ async def post_sub_task(
     return res
 
 
-@router.post(
-    "/grimuar", status_code=204, dependencies=[Depends(authenticate_superuser)]
-)
+@router.post("/grimuar", dependencies=[Depends(authenticate_superuser)])
 async def post_grimuar(
     data: CSVGrimuarExtractor = Depends(CSVGrimuarExtractor.from_body),
     session: AsyncSession = Depends(get_session),
     crud: TypicalSubTaskCrud = Depends(get_typical_task_crud),
-):
-    await crud.bulk_create(session, data.data)
+    mode: ImportMode = ImportMode.append,
+) -> ImportReport:
+    """`mode=sync` matches rows with the catalog by (name, task_type,
+    task_lvl) and writes only new and changed sub-tasks"""
+    report = await data.import_to(session, crud, mode)
     await session.commit()
+    return report
 
 
 # group
 @router.get("/group")
 async def get_group(
     response: Response,
+    request: Request,
     session: AsyncSession = Depends(get_session),
     ex_crud: ExtendedTaskGroupCrud = Depends(get_extended_group_crud),
     pagination: Paginator = Depends(paginator100),
@@ -101,6 +125,8 @@ async def get_group(
         ordering,
         ex_crud._select_model,
         TaskGroupFrontRead,
+        request=request,
+        etag=True,
     )
 
 
@@ -109,12 +135,10 @@ async def post_group(
     data: TaskGroupFrontCreate,
     session: AsyncSession = Depends(get_session),
     crud: TaskGroupCrud = Depends(get_group_crud),
-    ex_crud: ExtendedTaskGroupCrud = Depends(get_extended_group_crud),
 ) -> TaskGroupFrontRead:
     res: TaskGroup = await crud.extended_create(session, data)
     await session.commit()
-    fin = await ex_crud.get_one(session, id=res.id)
-    return fin
+    return TaskGroupFrontRead.model_validate(res)
 
 
 @router.post("/groups", deprecated=True)
@@ -1,9 +1,9 @@
 import datetime
 from typing import Annotated
 
-from pydantic import Field, StringConstraints, computed_field, model_validator
+from pydantic import Field, StringConstraints, model_validator
 from hmm.schemas.base import CreatedTimeSchemaMixin, OrmModel
-from hmm.core.crypto import get_hashed_password, verify_password
+from hmm.core.crypto import check_password, get_hashed_password, hash_password
 
 UserNameStr = Annotated[
     str,
@@ -32,22 +32,40 @@ class UserRawCreate(OrmModel):
 
 class UserCreate(UserRawCreate):
     password: SecPasswordStr = Field(exclude=True)
+    hashed_password: str | None = None
 
-    @computed_field
-    @property
-    def hashed_password(self) -> str:
-        return get_hashed_password(self.password)
+    async def with_hash(self) -> "UserCreate":
+        if self.hashed_password is not None:
+            return self
+        hashed = await hash_password(self.password)
+        return self.model_copy(update=dict(hashed_password=hashed))
+
+    def with_sync_hash(self) -> "UserCreate":
+        """Blocking variant of `with_hash` for callers outside the event
+        loop (migrations, scripts)"""
+        if self.hashed_password is not None:
+            return self
+        hashed = get_hashed_password(self.password)
+        return self.model_copy(update=dict(hashed_password=hashed))
 
 
 class UserPatch(OrmModel):
     password: SecPasswordStr | None = Field(None)
 
-    def model_patch(self, user: "UserSession") -> dict:
-        data = self.model_dump(exclude_unset=True, exclude_none=True)
+    async def model_patch(self, user: "UserSession") -> dict:
+        """Only the values that differ from `user`: an empty dict means
+        nothing to write (and no token version bump)"""
+        data = {
+            ki: vi
+            for ki, vi in self.model_dump(
+                exclude_unset=True, exclude_none=True
+            ).items()
+            if ki == "password" or getattr(user, ki, None) != vi
+        }
         if "password" in data and data["password"] is not None:
             new_password = data.pop("password")
-            if not verify_password(new_password, user.hashed_password):
-                data["hashed_password"] = get_hashed_password(new_password)
+            if not await check_password(new_password, user.hashed_password):
+                data["hashed_password"] = await hash_password(new_password)
                 data["updated_at"] = datetime.datetime.now()
         return data
 
@@ -102,3 +120,11 @@ class UserFronCreate(OrmModel):
 
 class UserSession(UserFront):
     updated_at: datetime.datetime
+    version: int = 0
+
+
+class UserClaims(UserRoledRead):
+    """User identity carried by a stateless access token"""
+
+    id: int
+    version: int = 0
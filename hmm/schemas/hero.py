@@ -1,3 +1,5 @@
+import uuid
+
 from pydantic import Field, model_validator
 from hmm.enum import HeroCategory
 from hmm.schemas.base import (
@@ -33,3 +35,12 @@ class HeroCreate(BaseHeroFields):
 
 class HeroFrontRead(BaseHeroFields, UuidIdSchemaMixin, CreatedTimeSchemaMixin):
     pass
+
+
+class HeroCandidate(OrmModel):
+    """Autopick input: only the columns covered by `ix_hmm_hero_class_mana`"""
+
+    id: uuid.UUID
+    hero_class: HeroCategory
+    hero_lvl: int
+    mana: float
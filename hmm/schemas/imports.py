@@ -0,0 +1,37 @@
+from pydantic import Field, ValidationError
+
+from hmm.schemas.base import OrmModel
+
+
+class ImportRowError(OrmModel):
+    row: int = Field(description="Номер строки данных в файле (с 1)")
+    error: str
+
+    @classmethod
+    def from_exception(cls, row: int, exc: Exception) -> "ImportRowError":
+        if isinstance(exc, ValidationError):
+            error = "; ".join(
+                f"{'.'.join(map(str, ei['loc']))}: {ei['msg']}"
+                for ei in exc.errors()
+            )
+        elif isinstance(exc, KeyError):
+            error = f"Missing column {exc}"
+        else:
+            error = str(exc) or exc.__class__.__name__
+        return cls(row=row, error=error)
+
+
+class ImportReport(OrmModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    errors: list[ImportRowError] = Field(
+        default_factory=list,
+        description="Ошибки по строкам (не больше IMPORT_MAX_ERRORS)",
+    )
+
+    def add_error(self, row: int, exc: Exception, max_errors: int):
+        self.failed += 1
+        if len(self.errors) < max_errors:
+            self.errors.append(ImportRowError.from_exception(row, exc))
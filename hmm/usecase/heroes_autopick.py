@@ -3,16 +3,20 @@ import datetime
 from functools import cache
 from typing import Callable
 import uuid
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 from loguru import logger
 
 from hmm.core.db import AsyncSessionMaker
-from hmm.crud.expedition import get_expedition_template_crud
+from hmm.core.utils.sql import in_array
+from hmm.crud.expedition import flatten_tasks, get_expedition_template_crud
 from hmm.crud.hero import get_hero_crud
 from hmm.crud.timetable import get_timetable_crud
 from hmm.enum import ExpeditionStatus
-from hmm.models.hero import Hero
+from hmm.models.expedition import ExpeditionTemplate
 from hmm.models.tasks.subtask_tasks import TypicalSubTask
+from hmm.schemas.hero import HeroCandidate
+from hmm.schemas.timetable import HeroUsedTimeTableCreate
 from hmm.usecase.services.heroes_autopick.my_greedy import (
     ExpHeroe,
     PickResult,
@@ -66,9 +70,7 @@ async def get_free_heroes(
         session, date_start, date_end
     )
     logger.debug("h_ids={}", h_ids)
-    return await get_hero_crud().get_multi(
-        session, operator_expressions=[Hero.id.not_in(h_ids)]
-    )
+    return await get_hero_crud().get_candidates(session, exclude_ids=h_ids)
 
 
 class HeroesAutoPickUseCase:
@@ -79,6 +81,41 @@ class HeroesAutoPickUseCase:
         self.calc_func = calc_func
         self.mk = mk
 
+    def pick(
+        self, tasks: list[TypicalSubTask], heroes: list[HeroCandidate]
+    ) -> tuple[PickResult, float]:
+        mean_exp_lvl = self.mk.calc_mean_lvl(tasks)
+        if not heroes:
+            raise ValueError("No free heroes")
+        selected_heroes: PickResult = self.calc_func(
+            tasks,
+            [
+                ExpHeroe(
+                    hero=hi,
+                    exp_k=self.mk.koef_calculator(hi.hero_lvl, mean_exp_lvl),
+                )
+                for hi in heroes
+            ],
+        )
+        if not selected_heroes.heroes:
+            raise ValueError("No heroes picked")
+        return selected_heroes, mean_exp_lvl
+
+    @staticmethod
+    def finished_values(
+        selected_heroes: PickResult, mean_exp_lvl: float
+    ) -> dict:
+        return dict(
+            status=ExpeditionStatus.finished,
+            w_mana=selected_heroes.manas.w_mana,
+            m_mana=selected_heroes.manas.m_mana,
+            s_mana=selected_heroes.manas.s_mana,
+            mean_exp_lvl=mean_exp_lvl,
+            total_mana=selected_heroes.manas.s_mana
+            + selected_heroes.manas.w_mana
+            + selected_heroes.manas.m_mana,
+        )
+
     async def process(self, expedition_id: uuid.UUID):
         exp_crud = get_expedition_template_crud()
         async with AsyncSessionMaker() as session:
@@ -90,26 +127,9 @@ class HeroesAutoPickUseCase:
                 heroes = await get_free_heroes(
                     session, expedition.date_start, expedition.date_end
                 )
-
-                mean_exp_lvl = self.mk.calc_mean_lvl(tasks)
-
-                if not heroes:
-                    raise ValueError()
-                selected_heroes: PickResult = await asyncio.to_thread(
-                    self.calc_func,
-                    tasks,
-                    [
-                        ExpHeroe(
-                            hero=hi,
-                            exp_k=self.mk.koef_calculator(
-                                hi.hero_lvl, mean_exp_lvl
-                            ),
-                        )
-                        for hi in heroes
-                    ],
+                selected_heroes, mean_exp_lvl = await asyncio.to_thread(
+                    self.pick, tasks, heroes
                 )
-                if not selected_heroes.heroes:
-                    raise ValueError()
                 await exp_crud.insert_heroes(
                     session, selected_heroes.heroes, expedition_id
                 )
@@ -117,15 +137,8 @@ class HeroesAutoPickUseCase:
                 await exp_crud.update(
                     session,
                     update_filter=dict(id=expedition_id),
-                    update_values=dict(
-                        status=ExpeditionStatus.finished,
-                        w_mana=selected_heroes.manas.w_mana,
-                        m_mana=selected_heroes.manas.m_mana,
-                        s_mana=selected_heroes.manas.s_mana,
-                        mean_exp_lvl=mean_exp_lvl,
-                        total_mana=selected_heroes.manas.s_mana
-                        + selected_heroes.manas.w_mana
-                        + selected_heroes.manas.m_mana,
+                    update_values=self.finished_values(
+                        selected_heroes, mean_exp_lvl
                     ),
                 )
                 await get_timetable_crud().set_timetables(
@@ -145,6 +158,101 @@ class HeroesAutoPickUseCase:
                     )
                     await session2.commit()
 
+    def pick_many(
+        self,
+        expeditions: list[ExpeditionTemplate],
+        heroes: list[HeroCandidate],
+        intervals: list[
+            tuple[uuid.UUID, datetime.datetime, datetime.datetime]
+        ],
+    ) -> tuple[dict[uuid.UUID, PickResult], list[dict]]:
+        """Staff expeditions one after another (by `date_start`) against an
+        in-memory timetable: every pick books the heroes for the next ones"""
+        is_banned = get_timetable_crud().is_banned
+        picks: dict[uuid.UUID, PickResult] = {}
+        values: list[dict] = []
+        for ei in sorted(expeditions, key=lambda x: x.date_start):
+            banned = {
+                hi
+                for hi, ts, te in intervals
+                if is_banned(ts, te, ei.date_start, ei.date_end)
+            }
+            try:
+                selected_heroes, mean_exp_lvl = self.pick(
+                    flatten_tasks(ei),
+                    [hi for hi in heroes if hi.id not in banned],
+                )
+            except Exception as e:
+                logger.warning("Expedition {}: {}", ei.id, e)
+                values.append(dict(id=ei.id, status=ExpeditionStatus.error))
+                continue
+            picks[ei.id] = selected_heroes
+            values.append(
+                dict(id=ei.id)
+                | self.finished_values(selected_heroes, mean_exp_lvl)
+            )
+            intervals.extend(
+                (hi, ei.date_start, ei.date_end)
+                for hi in selected_heroes.heroes
+            )
+        return picks, values
+
+    async def process_many(self, expedition_ids: list[uuid.UUID]):
+        """One staffing job for many expeditions: heroes and the timetable
+        are loaded once and all results are written with executemany"""
+        if not expedition_ids:
+            return
+        exp_crud = get_expedition_template_crud()
+        tt_crud = get_timetable_crud()
+        async with AsyncSessionMaker() as session:
+            try:
+                expeditions = await exp_crud.get_many_with_subtasks(
+                    session, expedition_ids
+                )
+                if not expeditions:
+                    return
+                heroes = await get_hero_crud().get_candidates(session)
+                intervals = await tt_crud.get_intervals(
+                    session,
+                    min(ei.date_start for ei in expeditions),
+                    max(ei.date_end for ei in expeditions),
+                )
+                picks, values = await asyncio.to_thread(
+                    self.pick_many, expeditions, heroes, intervals
+                )
+                dates = {
+                    ei.id: (ei.date_start, ei.date_end) for ei in expeditions
+                }
+                await exp_crud.insert_heroes_many(
+                    session, {ei: pi.heroes for ei, pi in picks.items()}
+                )
+                await session.execute(update(ExpeditionTemplate), values)
+                await tt_crud.set_timetables_many(
+                    session,
+                    [
+                        HeroUsedTimeTableCreate(
+                            hero_id=hi,
+                            expedition_id=ei,
+                            date_start=dates[ei][0],
+                            date_end=dates[ei][1],
+                        )
+                        for ei, pi in picks.items()
+                        for hi in pi.heroes
+                    ],
+                )
+                await session.commit()
+            except Exception as e:
+                logger.exception(e)
+                async with AsyncSessionMaker() as session2:
+                    await exp_crud.update(
+                        session2,
+                        update_filter=[
+                            in_array(ExpeditionTemplate.id, expedition_ids)
+                        ],
+                        update_values=dict(status=ExpeditionStatus.error),
+                    )
+                    await session2.commit()
+
 
 @cache
 def get_hap_usecase() -> HeroesAutoPickUseCase:
@@ -0,0 +1,148 @@
+import asyncio
+import csv
+import uuid
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from typing import Any, Generic, TypeVar
+
+from fastapi import UploadFile
+from loguru import logger
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from hmm.config import Settings, get_settings
+from hmm.core.exceptions import BadCsvFileError, BaseArgsRestException
+from hmm.core.utils.common import chunked
+from hmm.crud.base import CRUDBase
+from hmm.enum import ImportMode
+from hmm.schemas.imports import ImportReport
+
+SchemaType = TypeVar("SchemaType", bound=BaseModel)
+
+ParsedRow = tuple[int, BaseModel | Exception]
+
+
+async def spool_upload(
+    in_file: UploadFile, settings: Settings | None = None
+) -> Path:
+    """Copy the upload to `MEDIA_DIR/uploads` chunk by chunk; a partly
+    written file is removed"""
+    settings = settings or get_settings()
+    spool_dir = settings.MEDIA_DIR / "uploads"
+    await asyncio.to_thread(spool_dir.mkdir, parents=True, exist_ok=True)
+    suffix = Path(in_file.filename or "").suffix
+    path = spool_dir / f"{uuid.uuid4().hex}{suffix}"
+    out = await asyncio.to_thread(path.open, "wb")
+    try:
+        try:
+            while chunk := await in_file.read(settings.app.UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(out.write, chunk)
+        finally:
+            await asyncio.to_thread(out.close)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+class BaseFileExtractor(Generic[SchemaType]):
+    """Spooled upload parsed lazily: rows are read, validated and handed
+    out in batches, so memory doesn't depend on the file size"""
+
+    bad_file_error: type[BaseArgsRestException] = BadCsvFileError
+
+    def __init__(self, path: Path, settings: Settings | None = None):
+        self.path = path
+        self._settings = settings or get_settings()
+
+    @classmethod
+    def upload_options(cls, in_file: UploadFile) -> dict[str, Any]:
+        """Extra `__init__` arguments derived from the upload; raises for
+        unsupported files before anything is spooled"""
+        return {}
+
+    @classmethod
+    async def from_body(cls, in_file: UploadFile):
+        """Dependency: the spooled file is removed when the request is done,
+        whether or not it reached `import_to`"""
+        options = cls.upload_options(in_file)
+        extractor = cls(await spool_upload(in_file), **options)
+        try:
+            yield extractor
+        finally:
+            await asyncio.to_thread(extractor.cleanup)
+
+    def _open(self):
+        return self.path.open(
+            encoding="utf-8-sig",
+            newline="",
+            buffering=self._settings.app.UPLOAD_CHUNK_SIZE,
+        )
+
+    def iter_raw(self) -> Iterator[Any]:
+        raise NotImplementedError
+
+    def parse_row(self, raw: Any) -> SchemaType:
+        raise NotImplementedError
+
+    def iter_parsed(self) -> Iterator[ParsedRow]:
+        for row, raw in enumerate(self.iter_raw(), start=1):
+            try:
+                yield row, self.parse_row(raw)
+            except Exception as e:
+                yield row, e
+
+    async def batches(
+        self, size: int | None = None
+    ) -> AsyncIterator[list[ParsedRow]]:
+        it = chunked(
+            self.iter_parsed(), size or self._settings.app.BULK_CHUNK_SIZE
+        )
+        try:
+            while batch := await asyncio.to_thread(next, it, None):
+                yield batch
+        except (UnicodeDecodeError, csv.Error) as e:
+            logger.error("{}: {}", self.path.name, e)
+            raise self.bad_file_error() from e
+
+    def split_batch(
+        self, batch: list[ParsedRow], report: ImportReport
+    ) -> list[tuple[int, SchemaType]]:
+        valid = []
+        for row, res in batch:
+            if isinstance(res, Exception):
+                report.add_error(
+                    row, res, self._settings.app.IMPORT_MAX_ERRORS
+                )
+            else:
+                valid.append((row, res))
+        return valid
+
+    def cleanup(self):
+        self.path.unlink(missing_ok=True)
+
+    async def import_to(
+        self,
+        session: AsyncSession,
+        crud: CRUDBase,
+        mode: ImportMode = ImportMode.append,
+    ) -> ImportReport:
+        """`append` inserts every row, `sync` writes only the rows that are
+        new or changed (see `CRUDBase.sync_many`)"""
+        report = ImportReport()
+        try:
+            async for batch in self.batches():
+                valid = self.split_batch(batch, report)
+                if not valid:
+                    continue
+                rows = (ri for _, ri in valid)
+                if mode == ImportMode.sync:
+                    result = await crud.sync_many(session, rows)
+                    report.updated += result.updated
+                    report.unchanged += result.unchanged
+                else:
+                    result = await crud.bulk_create(session, rows)
+                report.inserted += result.count
+        finally:
+            await asyncio.to_thread(self.cleanup)
+        return report
@@ -1,19 +1,12 @@
-import asyncio
 import csv
-import io
-from fastapi import UploadFile
-from loguru import logger
+from collections.abc import Iterator
 
-from hmm.core.exceptions import BadCsvFileError
 from hmm.enum import SubTaskType
 from hmm.schemas.tasks.subtask_tasks import TypicalSubTaskCreate
+from hmm.usecase.services.extractors import BaseFileExtractor
 
 
-def _reader(in_file: UploadFile) -> io.StringIO:
-    return io.StringIO(in_file.file.read().decode())
-
-
-class CSVGrimuarExtractor:
+class CSVGrimuarExtractor(BaseFileExtractor[TypicalSubTaskCreate]):
 
     _mapper: dict[str, str] = {
         "Типовая работа": "name",
@@ -23,40 +16,28 @@ class CSVGrimuarExtractor:
         "Магия": "m_mana",
         "Бой": "w_mana",
     }
-
-    def __init__(self, data: list[TypicalSubTaskCreate]):
-        self.data = data
-
-    @classmethod
-    async def from_body(cls, in_file: UploadFile):
-        try:
-            reader = csv.DictReader(await asyncio.to_thread(_reader, in_file))
-            res = await asyncio.to_thread(cls.extract, reader)
-            return cls(res)
-        except Exception as e:
-            logger.error("{}", e)
-            raise BadCsvFileError() from e
-
-    @classmethod
-    def extract(cls, reader: csv.DictReader) -> list[TypicalSubTaskCreate]:
-        tlvl_map = {"простой": 1, "средний": 2, "сложный": 3}
-        res = []
-        ire = iter(reader)
-        for raw in ire:
-            tdata = {
-                cls._mapper[rki]: rvi
-                for rki, rvi in raw.items()
-                if rki in cls._mapper
-            }
-            tdata["task_type"] = (
-                SubTaskType.creation
-                if tdata["task_type"].strip().lower() == "создание"
-                else SubTaskType.updation
-            )
-            tdata["task_lvl"] = tlvl_map[tdata["task_lvl"].strip().lower()]
-            logger.debug("{}\n{}", raw, tdata)
-            tdata["w_mana"] = float(tdata["w_mana"].replace(",", "."))
-            tdata["m_mana"] = float(tdata["m_mana"].replace(",", "."))
-            tdata["s_mana"] = float(tdata["s_mana"].replace(",", "."))
-            res.append(TypicalSubTaskCreate(**tdata))
-        return res
+    _tlvl_map: dict[str, int] = {"простой": 1, "средний": 2, "сложный": 3}
+
+    def iter_raw(self) -> Iterator[dict]:
+        with self._open() as f:
+            yield from csv.DictReader(f)
+
+    def parse_row(self, raw: dict) -> TypicalSubTaskCreate:
+        tdata = {
+            self._mapper[rki]: rvi
+            for rki, rvi in raw.items()
+            if rki in self._mapper
+        }
+        tdata["task_type"] = (
+            SubTaskType.creation
+            if tdata["task_type"].strip().lower() == "создание"
+            else SubTaskType.updation
+        )
+        task_lvl = tdata["task_lvl"].strip().lower()
+        if task_lvl not in self._tlvl_map:
+            raise ValueError(f"Unknown task level: {task_lvl!r}")
+        tdata["task_lvl"] = self._tlvl_map[task_lvl]
+        tdata["w_mana"] = float(tdata["w_mana"].replace(",", "."))
+        tdata["m_mana"] = float(tdata["m_mana"].replace(",", "."))
+        tdata["s_mana"] = float(tdata["s_mana"].replace(",", "."))
+        return TypicalSubTaskCreate(**tdata)
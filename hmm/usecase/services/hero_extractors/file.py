@@ -0,0 +1,60 @@
+import csv
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from fastapi import UploadFile
+
+from hmm.config import Settings
+from hmm.core.exceptions import BadImportFileError
+from hmm.enum import HeroCategory
+from hmm.schemas.hero import HeroCreate
+from hmm.usecase.services.extractors import BaseFileExtractor
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+
+class HeroFileExtractor(BaseFileExtractor[HeroCreate]):
+    """CSV with a `name,hero_class,hero_lvl,mana` header or NDJSON with the
+    same keys. `hero_class` is either the number or the name"""
+
+    bad_file_error = BadImportFileError
+
+    def __init__(
+        self, path: Path, is_ndjson: bool, settings: Settings | None = None
+    ):
+        super().__init__(path, settings)
+        self.is_ndjson = is_ndjson
+
+    @classmethod
+    def upload_options(cls, in_file: UploadFile) -> dict[str, Any]:
+        suffix = Path(in_file.filename or "").suffix.lower()
+        is_ndjson = (
+            in_file.content_type in NDJSON_CONTENT_TYPES
+            or suffix in NDJSON_SUFFIXES
+        )
+        if not is_ndjson and suffix not in ("", ".csv"):
+            raise BadImportFileError(message=f"Unsupported file: {suffix}")
+        return dict(is_ndjson=is_ndjson)
+
+    def iter_raw(self) -> Iterator[Any]:
+        with self._open() as f:
+            if not self.is_ndjson:
+                yield from csv.DictReader(f)
+                return
+            for line in f:
+                if line.strip():
+                    yield line
+
+    def parse_row(self, raw: Any) -> HeroCreate:
+        if isinstance(raw, str):
+            raw = json.loads(raw)
+        hero_class = raw.get("hero_class")
+        if isinstance(hero_class, str) and not hero_class.strip().isdigit():
+            try:
+                raw["hero_class"] = HeroCategory[hero_class.strip().lower()]
+            except KeyError:
+                raise ValueError(f"Unknown hero_class: {hero_class!r}")
+        return HeroCreate.model_validate(raw)
@@ -10,7 +10,7 @@ from hmm.schemas.base import OrmModel
 
 from collections import defaultdict
 from hmm.enum import HeroCategory
-from hmm.schemas.hero import HeroFrontRead
+from hmm.schemas.hero import HeroCandidate
 from hmm.schemas.tasks.subtask_tasks import TypicalSubTaskFrontRead
 
 
@@ -21,7 +21,7 @@ class Manas(OrmModel):
 
 
 class ExpHeroe(OrmModel):
-    hero: HeroFrontRead
+    hero: HeroCandidate
     exp_k: float = 1
 
 